@@ -0,0 +1,324 @@
+"""
+Benchmarks the eval and dataset tools on synthetic fixtures, so that changes which
+make them slower can be caught. Each benchmark is run at several scales, and the
+results are appended to a JSON history file along with the current git commit, so
+runs from different commits can be compared:
+
+    python -m habitat_utils.benchmark --scales small medium
+    python -m habitat_utils.benchmark --only subsampler --compare <commit>
+
+The fixtures are:
+- ckpt.N.log files with "Average episode" lines, half of them without a step_id line
+  so that the corresponding fake ckpt.N.pth (with extra_state) has to be loaded
+- ckpt.N.pth files along with some .queued files, for the slurm_eval helpers
+- a split of content/*.json.gz files with random PointNav-like episodes, up to about
+  2 GB of uncompressed JSON at the xlarge scale
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import os.path as osp
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable
+from unittest import mock
+
+from habitat_utils import profiling
+from habitat_utils.episode_io import write_episodes
+
+# Number of log files / checkpoints, and (number of scenes, episodes per scene). An
+# episode is about 400 bytes of JSON, so the splits hold roughly 4 MB, 40 MB, 400 MB
+# and 2 GB of uncompressed JSON. Building the xlarge split takes a few minutes, and
+# it is rebuilt for every run.
+SCALES = {
+    "small": {"num_logs": 100, "num_scenes": 10, "episodes_per_scene": 1000},
+    "medium": {"num_logs": 1000, "num_scenes": 50, "episodes_per_scene": 2000},
+    "large": {"num_logs": 5000, "num_scenes": 200, "episodes_per_scene": 5000},
+    "xlarge": {"num_logs": 10000, "num_scenes": 500, "episodes_per_scene": 10000},
+}
+METRICS = ["reward", "distance_to_goal", "success", "spl", "soft_spl"]
+PREFIX = "bench"
+
+
+def make_log_fixtures(
+    root: str, num_logs: int, real_ckpts: bool = True, seed: int = 0
+) -> str:
+    """Create root/checkpoints/ckpt.N.pth and root/logs/ckpt.N.log for N < num_logs,
+    and a .queued file for every fourth checkpoint. Returns the checkpoint
+    directory. Without real_ckpts, the checkpoints are empty files (so torch isn't
+    needed) and every log has its step_id."""
+    if real_ckpts:
+        import torch
+
+    rng = random.Random(seed)
+    ckpt_dir = osp.join(root, "checkpoints")
+    log_dir = osp.join(root, "logs")
+    os.makedirs(ckpt_dir, exist_ok=True)
+    os.makedirs(log_dir, exist_ok=True)
+    for idx in range(num_logs):
+        ckpt_file = osp.join(ckpt_dir, f"ckpt.{idx}.pth")
+        if real_ckpts:
+            torch.save({"extra_state": {"step": idx * 10000}}, ckpt_file)
+        else:
+            with open(ckpt_file, "w") as f:
+                f.write("")
+        if idx % 4 == 0:
+            with open(ckpt_file.replace(".pth", f".{PREFIX}_queued"), "w") as f:
+                f.write("")
+        # Leave some logs without stats, like evaluations still in progress
+        if idx % 10 == 9:
+            continue
+        lines = [f"Evaluating checkpoint {ckpt_file}"] * 50
+        lines += [f"Average episode {k}: {rng.random():.4f}" for k in METRICS]
+        if idx % 2 == 0 or not real_ckpts:
+            lines.append(f"step_id: {idx * 10000}")
+        with open(osp.join(log_dir, f"ckpt.{idx}.log"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+    return ckpt_dir
+
+
+def make_episode(rng: random.Random, episode_id: int, scene_id: str) -> dict:
+    position = [rng.uniform(-10, 10), rng.uniform(0, 3), rng.uniform(-10, 10)]
+    goal = [rng.uniform(-10, 10), position[1], rng.uniform(-10, 10)]
+    euclidean = sum((a - b) ** 2 for a, b in zip(position, goal)) ** 0.5
+    return {
+        "episode_id": str(episode_id),
+        "scene_id": scene_id,
+        "start_position": position,
+        "start_rotation": [0.0, rng.uniform(-1, 1), 0.0, rng.uniform(-1, 1)],
+        "info": {"geodesic_distance": euclidean * rng.uniform(1, 1.5)},
+        "goals": [{"position": goal, "radius": None}],
+        "shortest_paths": None,
+        "start_room": None,
+    }
+
+
+def make_split_fixtures(
+    root: str, num_scenes: int, episodes_per_scene: int, seed: int = 0
+) -> str:
+    """Create root/content/scene_N.json.gz files with random episodes. Episode ids
+    are unique across the split. Returns the content directory."""
+    rng = random.Random(seed)
+    content_dir = osp.join(root, "content")
+    os.makedirs(content_dir, exist_ok=True)
+    for scene_idx in range(num_scenes):
+        scene_id = f"gibson/scene_{scene_idx}.glb"
+        first_id = scene_idx * episodes_per_scene
+        write_episodes(
+            osp.join(content_dir, f"scene_{scene_idx}.json.gz"),
+            (
+                make_episode(rng, first_id + i, scene_id)
+                for i in range(episodes_per_scene)
+            ),
+        )
+    return content_dir
+
+
+def bench_logs_to_tb(root: str, scale: dict) -> Callable:
+    from habitat_utils import logs_to_tb
+
+    ckpt_dir = make_log_fixtures(root, scale["num_logs"])
+    logs_dir = osp.join(osp.dirname(ckpt_dir), "logs")
+
+    def run():
+        # Skip the fixed wait for the tensorboard writer, which isn't our code
+        with mock.patch.object(logs_to_tb.time, "sleep"), open(
+            os.devnull, "w"
+        ) as f, contextlib.redirect_stdout(f):
+            logs_to_tb.main(logs_dir, replace=True, tb_name="tb_bench")
+
+    return run
+
+
+def bench_count_log_files(root: str, scale: dict) -> Callable:
+    from habitat_utils import slurm_eval
+
+    ckpt_dir = make_log_fixtures(root, scale["num_logs"], real_ckpts=False)
+    return lambda: slurm_eval.count_log_files(ckpt_dir, "logs", needs_stats=True)
+
+
+def bench_get_unqueued_checkpoints(root: str, scale: dict) -> Callable:
+    from habitat_utils import slurm_eval
+
+    ckpt_dir = make_log_fixtures(root, scale["num_logs"], real_ckpts=False)
+    # Evaluator.__init__ writes temporary slurm scripts next to the package, which
+    # get_unqueued_checkpoints doesn't need
+    evaluator = object.__new__(slurm_eval.Evaluator)
+    evaluator.ckpt_dir = osp.abspath(ckpt_dir)
+    evaluator.prefix = PREFIX
+    evaluator.logs_name = "logs"
+    return evaluator.get_unqueued_checkpoints
+
+
+def bench_extract_episode(root: str, scale: dict) -> Callable:
+    from habitat_utils import dataset_sampler
+
+    content_dir = make_split_fixtures(
+        root, scale["num_scenes"], scale["episodes_per_scene"]
+    )
+    gz_files = glob.glob(osp.join(content_dir, "*.json.gz"))
+    # Worst case: the episode is in the last file searched
+    last_id = scale["num_scenes"] * scale["episodes_per_scene"] - 1
+    gz_files.sort(key=lambda x: int(x.split("_")[-1].split(".")[0]))
+
+    def run():
+        with open(os.devnull, "w") as f, contextlib.redirect_stderr(f):
+            assert dataset_sampler.extract_episode([last_id], gz_files) is not None
+
+    return run
+
+
+def bench_subsampler(root: str, scale: dict) -> Callable:
+    from habitat_utils import dataset_random_subsampler
+
+    content_dir = make_split_fixtures(
+        root, scale["num_scenes"], scale["episodes_per_scene"]
+    )
+    num_episodes = scale["num_scenes"] * scale["episodes_per_scene"] // 2
+
+    def run():
+        with open(os.devnull, "w") as f, contextlib.redirect_stdout(f):
+            dataset_random_subsampler.process_directory(content_dir, num_episodes)
+
+    return run
+
+
+BENCHMARKS = {
+    "logs_to_tb": bench_logs_to_tb,
+    "count_log_files": bench_count_log_files,
+    "get_unqueued_checkpoints": bench_get_unqueued_checkpoints,
+    "extract_episode": bench_extract_episode,
+    "subsampler": bench_subsampler,
+}
+
+
+def time_benchmark(name: str, scale: dict, repeat: int) -> float:
+    """Best time in seconds over repeat runs. Fixtures are recreated for every run,
+    since some of the tools modify their inputs."""
+    times = []
+    for _ in range(repeat):
+        root = tempfile.mkdtemp(prefix=f"habitat_utils_bench_{name}_")
+        try:
+            run = BENCHMARKS[name](root, scale)
+            start_time = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start_time)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    return min(times)
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=osp.dirname(osp.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return "unknown"
+
+
+def load_history(history_file: str) -> list:
+    if not osp.exists(history_file):
+        return []
+    with open(history_file, "r") as f:
+        return json.load(f)
+
+
+def find_baseline(history: list, commit: str = None) -> dict:
+    """Latest run of the given commit, or the latest run if commit is None."""
+    for run in reversed(history):
+        if commit is None or run["commit"].startswith(commit):
+            return run
+    return None
+
+
+def main(names, scales, repeat, history_file, compare):
+    history = load_history(history_file)
+    baseline = find_baseline(history, compare)
+    if compare is not None and baseline is None:
+        print(f"No run of commit {compare} in {history_file}.")
+
+    results = {}
+    for name in names:
+        results[name] = {}
+        for scale_name in scales:
+            try:
+                seconds = time_benchmark(name, SCALES[scale_name], repeat)
+            except ImportError as e:
+                print(f"Skipping {name}: {e}")
+                break
+            results[name][scale_name] = seconds
+            line = f"{name:<26} {scale_name:<8} {seconds:9.3f}s"
+            previous = (baseline or {}).get("results", {}).get(name, {})
+            if scale_name in previous:
+                ratio = seconds / max(previous[scale_name], 1e-9)
+                line += f"  {ratio:5.2f}x vs {baseline['commit']}"
+            print(line)
+
+    history.append(
+        {
+            "commit": get_commit(),
+            "timestamp": str(datetime.now())[:19],
+            "python": platform.python_version(),
+            "host": platform.node(),
+            "repeat": repeat,
+            "results": results,
+        }
+    )
+    tmp_file = f"{history_file}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp_file, history_file)
+    print(f"Appended results to {history_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=list(BENCHMARKS),
+        help="Benchmarks to run",
+        default=list(BENCHMARKS),
+    )
+    parser.add_argument(
+        "--scales",
+        nargs="+",
+        choices=list(SCALES),
+        help="Fixture sizes to run each benchmark at",
+        default=["small", "medium"],
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        help="Number of runs per benchmark; the best time is kept",
+        default=3,
+    )
+    parser.add_argument(
+        "--history",
+        help="JSON file that results are appended to",
+        default="benchmark_history.json",
+    )
+    parser.add_argument(
+        "--compare",
+        help="Commit to compare against (default: the latest run in the history)",
+        default=None,
+    )
+    profiling.add_profile_args(parser, "benchmark_profile")
+    args = parser.parse_args()
+    with profiling.session(args.profile, args.cprofile):
+        main(args.only, args.scales, args.repeat, args.history, args.compare)
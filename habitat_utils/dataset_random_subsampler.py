@@ -1,13 +1,19 @@
 import argparse
 import glob
-import gzip
-import json
 import os
 import random
 from typing import List
 
+from habitat_utils import profiling
+from habitat_utils.episode_io import (
+    add_writer_args,
+    read_episodes,
+    write_episodes,
+    writer_kwargs,
+)
 
-def random_episodes(json_gz_file_path: str, N: int) -> str:
+
+def random_episodes(json_gz_file_path: str, N: int, write_kwargs: dict = None) -> str:
     """
     Randomly selects N episodes from a JSON.gz file, creates a new JSON.gz file
     with only the selected episodes, and returns the path to the new file.
@@ -15,13 +21,13 @@ def random_episodes(json_gz_file_path: str, N: int) -> str:
     Parameters:
         json_gz_file_path (str): Path to the input JSON.gz file.
         N (int): Number of episodes to select randomly.
+        write_kwargs (dict): Options passed on to write_episodes.
 
     Returns:
         str: Path to the new JSON.gz file containing the selected episodes.
     """
     # Step 1: Read the input JSON data from the gzipped file
-    with gzip.open(json_gz_file_path, "rt", encoding="utf-8") as f:
-        data = json.load(f)
+    data = read_episodes(json_gz_file_path)
 
     # Extract the 'episodes' list from the dictionary
     episodes = data.get("episodes", [])
@@ -36,14 +42,13 @@ def random_episodes(json_gz_file_path: str, N: int) -> str:
     output_dir = os.path.join(os.path.dirname(json_gz_file_path), "subsampled")
     os.makedirs(output_dir, exist_ok=True)
 
-    # Form the new data dictionary with only the selected episodes
-    data["episodes"] = selected_episodes
+    # Keep every other key of the dictionary alongside the selected episodes
+    other = {k: v for k, v in data.items() if k != "episodes"}
 
     # Step 3: Save the resulting data with N episodes into a new JSON.gz file in the
     # 'subsampled' directory
     output_file_path = os.path.join(output_dir, os.path.basename(json_gz_file_path))
-    with gzip.open(output_file_path, "wt", encoding="utf-8") as f:
-        json.dump(data, f)
+    write_episodes(output_file_path, selected_episodes, other, **(write_kwargs or {}))
 
     return output_file_path
 
@@ -74,7 +79,7 @@ def distribute_N_values(X: int, num_bins: int) -> List[int]:
     return N_values
 
 
-def process_directory(directory_path: str, X: int) -> None:
+def process_directory(directory_path: str, X: int, write_kwargs: dict = None) -> None:
     """
     Processes all .json.gz files within the given directory, randomly selecting
     episodes for each file, and saves the new files with the desired total number
@@ -83,12 +88,14 @@ def process_directory(directory_path: str, X: int) -> None:
     Parameters:
         directory_path (str): Path to the directory containing .json.gz files.
         X (int): Total number of episodes desired after processing.
+        write_kwargs (dict): Options passed on to write_episodes.
 
     Returns:
         None
     """
     # Step 1: Find all .json.gz files within the given directory
-    json_files = glob.glob(os.path.join(directory_path, "*.json.gz"))
+    with profiling.span("glob"):
+        json_files = glob.glob(os.path.join(directory_path, "*.json.gz"))
 
     if not json_files:
         print("No .json.gz files found in the directory.")
@@ -101,7 +108,7 @@ def process_directory(directory_path: str, X: int) -> None:
 
     for file_path, N in zip(json_files, N_values):
         # Step 3: Use the 'random_episodes' function for each file
-        output_file_path = random_episodes(file_path, N)
+        output_file_path = random_episodes(file_path, N, write_kwargs)
         print(f"Successfully saved {N} random episodes to {output_file_path}")
 
 
@@ -120,12 +127,15 @@ def main():
     parser.add_argument(
         "num_episodes", type=int, help="Total number of episodes desired after processing."
     )
+    add_writer_args(parser)
+    profiling.add_profile_args(parser, "dataset_random_subsampler_profile")
     args = parser.parse_args()
 
     directory_path = args.directory
     num_episodes = args.num_episodes
 
-    process_directory(directory_path, num_episodes)
+    with profiling.session(args.profile, args.cprofile):
+        process_directory(directory_path, num_episodes, writer_kwargs(args))
 
 
 if __name__ == "__main__":
@@ -1,11 +1,17 @@
 import argparse
-import gzip
-import json
 import os
 import os.path as osp
 
 import tqdm
 
+from habitat_utils import profiling
+from habitat_utils.episode_io import (
+    add_writer_args,
+    read_episodes,
+    write_episodes,
+    writer_kwargs,
+)
+
 ALL_EPS = []
 
 
@@ -25,9 +31,16 @@ def main():
         type=str,
         help="Additional packages to import if desired, for updating habitat registry",
     )
+    add_writer_args(parser)
+    profiling.add_profile_args(parser, "dataset_sampler_profile")
 
     args = parser.parse_args()
+    with profiling.session(args.profile, args.cprofile):
+        sample(args)
+
 
+def sample(args):
+    """Write the requested episodes of the split to data/<output_split>.json.gz."""
     if args.packages is not None:
         for package in args.packages.split(","):
             print(f"Importing {package}...")
@@ -44,10 +57,11 @@ def main():
     data_path = data_path_template.format(split=args.split)
     # Use os.walk on data_path to find all the json.gz files
     gz_files = []
-    for root, dirs, files in os.walk(osp.dirname(data_path)):
-        for file in files:
-            if file.endswith(".json.gz"):
-                gz_files.append(osp.join(root, file))
+    with profiling.span("glob"):
+        for root, dirs, files in os.walk(osp.dirname(data_path)):
+            for file in files:
+                if file.endswith(".json.gz"):
+                    gz_files.append(osp.join(root, file))
     data_dict = extract_episode(args.episode_ids, gz_files)
     filtered_episodes = [
         ep for ep in data_dict["episodes"] if int(ep["episode_id"]) in args.episode_ids
@@ -55,8 +69,7 @@ def main():
     other = {k: v for k, v in data_dict.items() if k != "episodes"}
     new_data_path = f"data/{args.output_split}.json.gz"
     os.makedirs("data", exist_ok=True)
-    with gzip.open(new_data_path, "wt") as f:
-        json.dump({"episodes": filtered_episodes, **other}, f)
+    write_episodes(new_data_path, filtered_episodes, other, **writer_kwargs(args))
 
     print("The following command opt will work with the new split:")
     print(f"habitat.dataset.data_path='data/{args.output_split}.json.gz'")
@@ -64,8 +77,7 @@ def main():
 
 def extract_episode(episode_ids, gz_files):
     for gz_file in tqdm.tqdm(gz_files):
-        with gzip.open(gz_file, "rt") as f:
-            data_dict = json.load(f)
+        data_dict = read_episodes(gz_file)
         for ep in data_dict["episodes"]:
             if int(ep["episode_id"]) in episode_ids:
                 return data_dict
@@ -0,0 +1,299 @@
+"""
+Prints statistics of the episodes of a dataset split: episodes per scene, histograms
+of geodesic and Euclidean start-to-goal distances, and object category counts for
+ObjectNav. For example:
+
+    python -m habitat_utils.dataset_stats data/datasets/pointnav/hm3d/v1/train \
+        --validate hm3d train --expected-per-scene 1000 --export train_stats.json
+
+The numeric fields of each .json.gz file are extracted into arrays once and cached,
+keyed by the file's mtime and size, so later reports don't decode the files again.
+All statistics are then computed with NumPy over the arrays of the whole split.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import os.path as osp
+import uuid
+
+import numpy as np
+
+from habitat_utils import profiling
+from habitat_utils.episode_io import read_episodes
+from habitat_utils.splits import load_train_val_splits
+
+DEFAULT_CACHE_DIR = osp.join(osp.expanduser("~"), ".cache", "habitat_utils", "stats")
+FIELDS = ["scene", "geodesic", "start", "goal", "category"]
+
+
+def find_dataset_files(paths: list) -> list:
+    """All .json.gz files in the given files and directories. Chunks of scenes that
+    generate_pointnav_episodes hasn't merged yet are skipped."""
+    files = []
+    for path in paths:
+        if osp.isfile(path):
+            files.append(path)
+            continue
+        for root, dirs, filenames in os.walk(path):
+            dirs[:] = [d for d in dirs if not d.endswith(".parts")]
+            files.extend(osp.join(root, f) for f in filenames if f.endswith(".json.gz"))
+    return sorted(files)
+
+
+def extract_fields(path: str) -> dict:
+    """Read the fields needed for the statistics out of a dataset file. Missing
+    values are NaN (numbers) or empty strings."""
+    episodes = read_episodes(path)["episodes"]
+    nan_position = [np.nan] * 3
+    # The scene comes from each episode's scene_id rather than the file name, so
+    # that splits stored in a single file work too
+    scene = [osp.basename(ep.get("scene_id", "")).split(".")[0] for ep in episodes]
+    geodesic = [
+        (ep.get("info") or {}).get("geodesic_distance", np.nan) for ep in episodes
+    ]
+    start = [ep.get("start_position", nan_position) for ep in episodes]
+    # ObjectNav episodes keep their goals elsewhere and have an empty goals list
+    goal = [
+        ep["goals"][0].get("position", nan_position)
+        if ep.get("goals")
+        else nan_position
+        for ep in episodes
+    ]
+    category = [ep.get("object_category") or "" for ep in episodes]
+    return {
+        "scene": np.array(scene, dtype=str),
+        "geodesic": np.array(geodesic, dtype=np.float64),
+        "start": np.array(start, dtype=np.float64).reshape(-1, 3),
+        "goal": np.array(goal, dtype=np.float64).reshape(-1, 3),
+        "category": np.array(category, dtype=str),
+    }
+
+
+def load_fields(path: str, cache_dir: str = DEFAULT_CACHE_DIR) -> dict:
+    """extract_fields(path), served from the cache if the file hasn't changed."""
+    stat = os.stat(path)
+    key = hashlib.sha1(osp.abspath(path).encode()).hexdigest()
+    cache_file = osp.join(cache_dir, f"{key}.npz")
+    if osp.exists(cache_file):
+        with profiling.span("load_cache"), np.load(cache_file) as cached:
+            if (
+                int(cached["mtime_ns"]) == stat.st_mtime_ns
+                and int(cached["size"]) == stat.st_size
+            ):
+                return {k: cached[k] for k in FIELDS}
+
+    with profiling.span("extract_fields", path=osp.basename(path)):
+        fields = extract_fields(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    # The cache is often on a home directory shared by several nodes, where pids
+    # aren't unique
+    tmp_file = f"{cache_file}.{uuid.uuid4().hex}.tmp.npz"
+    np.savez(tmp_file, mtime_ns=stat.st_mtime_ns, size=stat.st_size, **fields)
+    os.replace(tmp_file, cache_file)
+    return fields
+
+
+def summarize(values: np.ndarray) -> dict:
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return {"count": 0}
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    return {
+        "count": int(len(values)),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "p5": float(p5),
+        "median": float(p50),
+        "p95": float(p95),
+        "max": float(values.max()),
+    }
+
+
+def histogram(values: np.ndarray, bins: int, max_value: float) -> dict:
+    values = values[np.isfinite(values)]
+    counts, edges = np.histogram(values, bins=bins, range=(0, max_value))
+    return {"edges": edges.tolist(), "counts": counts.tolist()}
+
+
+def compute_stats(fields: dict, bins: int = 20) -> dict:
+    """Compute every statistic of the report from the concatenated fields of a
+    split."""
+    geodesic = fields["geodesic"]
+    euclidean = np.linalg.norm(fields["goal"] - fields["start"], axis=1)
+    ratio = np.full_like(geodesic, np.nan)
+    np.divide(geodesic, euclidean, out=ratio, where=euclidean > 0)
+    # Shared range so that the two histograms can be compared bin by bin
+    finite = np.concatenate([geodesic, euclidean])
+    finite = finite[np.isfinite(finite)]
+    max_distance = float(finite.max()) if len(finite) else 1.0
+
+    scenes, scene_counts = np.unique(fields["scene"], return_counts=True)
+    categories, category_counts = np.unique(
+        fields["category"][fields["category"] != ""], return_counts=True
+    )
+    return {
+        "num_episodes": int(len(geodesic)),
+        "num_scenes": int(len(scenes)),
+        "episodes_per_scene": dict(zip(scenes.tolist(), scene_counts.tolist())),
+        "episodes_per_scene_summary": summarize(scene_counts.astype(np.float64)),
+        "geodesic_distance": summarize(geodesic),
+        "euclidean_distance": summarize(euclidean),
+        "geodesic_to_euclidean_ratio": summarize(ratio),
+        "geodesic_distance_histogram": histogram(geodesic, bins, max_distance),
+        "euclidean_distance_histogram": histogram(euclidean, bins, max_distance),
+        "object_categories": dict(zip(categories.tolist(), category_counts.tolist())),
+    }
+
+
+def validate(
+    files: list,
+    stats: dict,
+    dataset_type: str,
+    split: str,
+    expected_per_scene: int = None,
+) -> list:
+    """Check a split generated by generate_pointnav_episodes against the scene list
+    of train_val_splits.yaml. Returns a list of problems (empty if none)."""
+    # Same naming as generate_pointnav_episodes: HM3D content files drop the
+    # "00000-" prefix of the scene directory
+    expected = {
+        scene.split("-")[-1] if dataset_type == "hm3d" else scene
+        for scene in load_train_val_splits()[dataset_type][split]
+    }
+    content = {
+        osp.basename(f)[: -len(".json.gz")]
+        for f in files
+        if osp.basename(osp.dirname(f)) == "content"
+    }
+    counts = stats["episodes_per_scene"]
+
+    problems = []
+    for scene in sorted(expected - content):
+        problems.append(f"Missing content file for scene {scene}")
+    for scene in sorted(content - expected):
+        problems.append(f"Scene {scene} is not in the {dataset_type} {split} split")
+    for scene in sorted(expected & content):
+        num_episodes = counts.get(scene, 0)
+        if num_episodes == 0:
+            problems.append(f"Scene {scene} has no episodes")
+        elif expected_per_scene is not None and num_episodes != expected_per_scene:
+            problems.append(
+                f"Scene {scene} has {num_episodes} episodes instead of "
+                f"{expected_per_scene}"
+            )
+    return problems
+
+
+def print_histogram(name: str, hist: dict, width: int = 40):
+    print(f"{name}:")
+    max_count = max(max(hist["counts"]), 1)
+    edges = hist["edges"]
+    for i, count in enumerate(hist["counts"]):
+        bar = "#" * round(width * count / max_count)
+        print(f"  {edges[i]:7.2f} - {edges[i + 1]:7.2f} {count:>9} {bar}")
+
+
+def print_report(stats: dict):
+    print(f"{stats['num_episodes']} episodes in {stats['num_scenes']} scenes")
+    for name in [
+        "episodes_per_scene_summary",
+        "geodesic_distance",
+        "euclidean_distance",
+        "geodesic_to_euclidean_ratio",
+    ]:
+        summary = stats[name]
+        if summary["count"] == 0:
+            print(f"{name}: no values")
+            continue
+        print(
+            f"{name}: mean {summary['mean']:.2f}, std {summary['std']:.2f}, "
+            f"min {summary['min']:.2f}, median {summary['median']:.2f}, "
+            f"p95 {summary['p95']:.2f}, max {summary['max']:.2f}"
+        )
+    print_histogram("geodesic_distance", stats["geodesic_distance_histogram"])
+    print_histogram("euclidean_distance", stats["euclidean_distance_histogram"])
+    if stats["object_categories"]:
+        print("object_categories:")
+        categories = sorted(stats["object_categories"].items(), key=lambda x: -x[1])
+        for category, count in categories:
+            print(f"  {category:<24} {count:>9}")
+
+
+def main(
+    paths,
+    bins,
+    export,
+    cache_dir,
+    validate_split,
+    expected_per_scene,
+):
+    files = find_dataset_files(paths)
+    if not files:
+        print("No .json.gz files found.")
+        return
+    print(f"Found {len(files)} .json.gz files.")
+    per_file = [load_fields(f, cache_dir) for f in files]
+    with profiling.span("compute_stats"):
+        fields = {k: np.concatenate([i[k] for i in per_file]) for k in FIELDS}
+        stats = compute_stats(fields, bins)
+    print_report(stats)
+
+    if validate_split is not None:
+        problems = validate(files, stats, *validate_split, expected_per_scene)
+        stats["problems"] = problems
+        for problem in problems:
+            print(problem)
+        print(f"Validation found {len(problems)} problems.")
+
+    if export is not None:
+        with open(export, "w") as f:
+            json.dump(stats, f, indent=2)
+        print(f"Wrote {export}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="Dataset .json.gz files, or directories to search for them",
+    )
+    parser.add_argument(
+        "-b", "--bins", type=int, help="Number of histogram bins", default=20
+    )
+    parser.add_argument(
+        "-e", "--export", help="Also write the report to this JSON file"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Where to cache the arrays extracted from each file",
+        default=DEFAULT_CACHE_DIR,
+    )
+    parser.add_argument(
+        "--validate",
+        nargs=2,
+        metavar=("DATASET_TYPE", "SPLIT"),
+        help="Check the content files against the scenes of train_val_splits.yaml, "
+        "e.g. --validate hm3d train",
+    )
+    parser.add_argument(
+        "--expected-per-scene",
+        type=int,
+        help="With --validate, the number of episodes every scene should have",
+    )
+    profiling.add_profile_args(parser, "dataset_stats_profile")
+    args = parser.parse_args()
+    with profiling.session(args.profile, args.cprofile):
+        main(
+            args.paths,
+            args.bins,
+            args.export,
+            args.cache_dir,
+            args.validate,
+            args.expected_per_scene,
+        )
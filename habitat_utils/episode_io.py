@@ -0,0 +1,171 @@
+"""
+Reading and writing of habitat episode datasets (.json.gz files holding a dict with an
+"episodes" list). Episodes are encoded one at a time and streamed into the compressor,
+so the whole dataset never has to exist as a single string.
+
+orjson is used as the encoder when fast_json is requested and it is installed. Its
+output is compact but otherwise plain JSON, so habitat loads it the same way; note
+that, unlike the json module, it writes NaN and Infinity as null. Files are read with
+orjson whenever it is installed, falling back to the json module for files holding
+NaN or Infinity.
+"""
+
+import gzip
+import json
+import os
+import uuid
+from typing import Callable, Iterable, Optional
+
+from habitat_utils import profiling
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# zlib's own default. Level 9 is several times slower for a few percent smaller files.
+DEFAULT_COMPRESSLEVEL = 6
+# Amount of encoded data handed to the compressor at once
+_BUFFER_SIZE = 2**20
+
+
+def read_episodes(path: str) -> dict:
+    """Load a .json.gz dataset, with orjson if it is installed."""
+    with profiling.span("read_episodes", path=os.path.basename(path)):
+        with gzip.open(path, "rb") as f:
+            contents = f.read()
+        if orjson is not None:
+            try:
+                return orjson.loads(contents)
+            except orjson.JSONDecodeError:
+                # orjson rejects the NaN and Infinity that the json module writes
+                pass
+        return json.loads(contents)
+
+
+def count_path(path: str) -> str:
+    """Path of the episode-count sidecar of a dataset file. It does not end in
+    .json.gz, so habitat never mistakes it for a scene."""
+    if path.endswith(".json.gz"):
+        path = path[: -len(".json.gz")]
+    return path + ".count.json"
+
+
+def round_floats(obj, ndigits: int, default: Optional[Callable] = None):
+    """Return a copy of obj made of dicts, lists and scalars, with every float
+    rounded to ndigits decimals. Other objects are first converted with default."""
+    if isinstance(obj, float):
+        return round(obj, ndigits)
+    if isinstance(obj, dict):
+        return {k: round_floats(v, ndigits, default) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [round_floats(v, ndigits, default) for v in obj]
+    if obj is None or isinstance(obj, (str, int, bool)):
+        return obj
+    if default is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+    return round_floats(default(obj), ndigits, default)
+
+
+def _get_encoder(default: Optional[Callable], fast_json: bool) -> Callable:
+    """Return a function that encodes an object to bytes."""
+    if fast_json and orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        return lambda obj: orjson.dumps(obj, default=default, option=option)
+    encoder = json.JSONEncoder(default=default)
+    return lambda obj: encoder.encode(obj).encode("utf-8")
+
+
+def write_episodes(
+    path: str,
+    episodes: Iterable,
+    extra: Optional[dict] = None,
+    compresslevel: int = DEFAULT_COMPRESSLEVEL,
+    float_precision: Optional[int] = None,
+    fast_json: bool = False,
+    write_count: bool = False,
+    default: Optional[Callable] = None,
+) -> int:
+    """Write {"episodes": [...], **extra} to a .json.gz file and return the number of
+    episodes written.
+
+    Parameters:
+        path (str): Output file. It is written to a uniquely named temporary file
+            first and then renamed, so readers never see a partial file, even when
+            processes on several nodes write to the same directory.
+        episodes (Iterable): Episodes, either dicts or objects that default can
+            convert (e.g. habitat's DatasetJSONEncoder().default).
+        extra (dict): Other top-level keys of the dataset.
+        compresslevel (int): gzip compression level, from 1 (fast) to 9 (small).
+        float_precision (int): If given, round every float to this many decimals.
+        fast_json (bool): Encode with orjson if it is installed.
+        write_count (bool): Also write the episode count to count_path(path).
+        default (Callable): Fallback for objects the encoder can't serialize.
+    """
+    encode = _get_encoder(default, fast_json)
+    if float_precision is not None:
+        encode_raw = encode
+        encode = lambda obj: encode_raw(round_floats(obj, float_precision, default))
+
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    num_episodes = 0
+    with profiling.span("write_episodes", path=os.path.basename(path)), gzip.open(
+        tmp_path, "wb", compresslevel=compresslevel
+    ) as f:
+        buffer = [b'{"episodes": [']
+        buffer_size = 0
+        for ep in episodes:
+            encoded = encode(ep)
+            buffer.append(encoded if num_episodes == 0 else b", " + encoded)
+            buffer_size += len(encoded)
+            num_episodes += 1
+            if buffer_size >= _BUFFER_SIZE:
+                f.write(b"".join(buffer))
+                buffer, buffer_size = [], 0
+        buffer.append(b"]")
+        for k, v in (extra or {}).items():
+            buffer.append(b", " + encode(k) + b": " + encode(v))
+        buffer.append(b"}")
+        f.write(b"".join(buffer))
+    os.replace(tmp_path, path)
+
+    if write_count:
+        with open(count_path(path), "w") as f:
+            json.dump({"num_episodes": num_episodes}, f)
+    return num_episodes
+
+
+def add_writer_args(parser):
+    """Add the command line options of write_episodes to an argparse parser."""
+    parser.add_argument(
+        "--compresslevel",
+        type=int,
+        help="gzip compression level of the output, from 1 (fast) to 9 (small)",
+        default=DEFAULT_COMPRESSLEVEL,
+    )
+    parser.add_argument(
+        "--float-precision",
+        type=int,
+        help="Round floats in the output to this many decimals",
+        default=None,
+    )
+    parser.add_argument(
+        "--fast-json",
+        action="store_true",
+        help="Encode the output with orjson if it is installed",
+    )
+    parser.add_argument(
+        "--write-counts",
+        action="store_true",
+        help="Write the number of episodes of each output file to a .count.json file",
+    )
+
+
+def writer_kwargs(args) -> dict:
+    """Keyword arguments of write_episodes from options added by add_writer_args."""
+    return {
+        "compresslevel": args.compresslevel,
+        "float_precision": args.float_precision,
+        "fast_json": args.fast_json,
+        "write_count": args.write_counts,
+    }
@@ -1,70 +1,501 @@
 import argparse
-import gzip
+import collections
+import glob
+import queue as queue_lib
 import random
+import shutil
+import sys
+import time
+import zlib
 
 import pathos.multiprocessing as multiprocessing
 import os
 import os.path as osp
 
-import habitat
 import tqdm
-import yaml
-from habitat.datasets.pointnav.pointnav_generator import generate_pointnav_episode
 from omegaconf import DictConfig
 
+from habitat_utils import profiling
+from habitat_utils.episode_io import (
+    add_writer_args,
+    read_episodes,
+    write_episodes,
+    writer_kwargs,
+)
+from habitat_utils.scene_scheduler import (
+    estimate_costs,
+    format_makespan,
+    load_timings,
+    longest_first,
+    predict_makespan,
+    record_timings,
+    scene_asset_size,
+)
+from habitat_utils.splits import load_train_val_splits
+from habitat_utils.work_queue import WorkQueue
 
-parent_dir = osp.dirname(osp.dirname(osp.abspath(__file__)))
-with open(osp.join(parent_dir, "train_val_splits.yaml"), "r") as f:
-    TRAIN_VAL_SPLITS = yaml.safe_load(f)
 
-def _generate_fn(
-    scene: str,
-    scene_dir: str,
-    cfg: DictConfig,
-    out_dir: str,
-    num_episodes_per_scene: int,
-    is_hm3d: bool = False,
-    split="train",
-):
+TRAIN_VAL_SPLITS = load_train_val_splits()
+
+# Simulator owned by the current pool worker. It is created on the first scene the
+# worker handles and then reconfigured for every following scene.
+_WORKER_STATE = {"sim": None, "num_tasks": 0}
+
+
+class HabitatBackend:
+    """Everything the generator needs from habitat. habitat is only imported when
+    these methods run, so tests can pass a subclass that fakes the config, the
+    simulator and the episodes to run generate_dataset without habitat or scene
+    assets."""
+
+    def load_config(self, config_path: str, overrides: list):
+        import habitat
+
+        return habitat.get_config(config_path=config_path, overrides=overrides)
+
+    def scene_config(self, cfg: DictConfig, scene_path: str):
+        """Insert the path to the scene into the config and return the simulator
+        config that loads it."""
+        import habitat
+
+        with habitat.config.read_write(cfg):
+            cfg.habitat.simulator.scene = scene_path
+        return cfg.habitat.simulator
+
+    def make_sim(self, sim_cfg: DictConfig):
+        """Return a simulator with reconfigure() and close()."""
+        import habitat
+
+        return habitat.sims.make_sim("Sim-v0", config=sim_cfg)
+
+    def generate_episodes(self, sim, num_episodes: int, seed: int) -> list:
+        """Return num_episodes episodes with episode_id and scene_id attributes. The
+        same seed must always give the same episodes."""
+        import numpy as np
+        from habitat.datasets.pointnav.pointnav_generator import (
+            generate_pointnav_episode,
+        )
+
+        # Seeds the simulator and its pathfinder, which sample the start and goal
+        # positions; np.random picks the start rotations
+        sim.seed(seed)
+        np.random.seed(seed)
+        random.seed(seed)
+        return list(
+            generate_pointnav_episode(sim, num_episodes, is_gen_shortest_path=False)
+        )
+
+    def json_default(self, obj):
+        """Serialize what json can't, like habitat's datasets do."""
+        from habitat.core.utils import DatasetJSONEncoder
+
+        return DatasetJSONEncoder().default(obj)
+
+
+def _get_sim(sim_cfg: DictConfig, backend: HabitatBackend):
+    sim = _WORKER_STATE["sim"]
+    if sim is None:
+        with profiling.span("make_sim"):
+            sim = backend.make_sim(sim_cfg)
+        _WORKER_STATE["sim"] = sim
+    else:
+        with profiling.span("reconfigure_sim"):
+            sim.reconfigure(sim_cfg)
+    return sim
+
+
+def _close_sim():
+    sim = _WORKER_STATE["sim"]
+    if sim is not None:
+        _WORKER_STATE["sim"] = None
+        with profiling.span("close_sim"):
+            sim.close()
+
+
+def get_rss_mb():
+    """Current resident set size of this process in MB, or None where /proc isn't
+    available (the RSS ceiling is then disabled)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            rss_pages = int(f.read().split()[1])
+        return rss_pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def _end_task(used_sim: bool, max_tasks_per_worker=None, max_rss_mb=None) -> bool:
+    """Close the worker's simulator once it has been used for max_tasks_per_worker
+    tasks, or once the worker's RSS exceeds max_rss_mb (a new simulator is then
+    created for the next scene). Tasks that returned without using the simulator,
+    e.g. because another process owns them, don't count. Returns True if the worker
+    has reached max_tasks_per_worker and should be replaced by a new process."""
+    if not used_sim:
+        return False
+    _WORKER_STATE["num_tasks"] += 1
+    if max_tasks_per_worker is not None and (
+        _WORKER_STATE["num_tasks"] >= max_tasks_per_worker
+    ):
+        _close_sim()
+        return True
+    if max_rss_mb is not None:
+        rss_mb = get_rss_mb()
+        if rss_mb is not None and rss_mb > max_rss_mb:
+            _close_sim()
+    return False
+
+
+def _scene_paths(scene: str, split: str, is_hm3d: bool):
+    """Return the scene name used for the output file and the path of the scene
+    relative to the scene directory."""
     if is_hm3d:
         scene_name = scene.split("-")[-1]
         scene_path = f"hm3d/{split}/{scene}/{scene_name}.basis.glb"
     else:
         scene_name = scene
         scene_path = f"gibson/{scene}.glb"
+    return scene_name, scene_path
 
-    # Skip this scene if a dataset was or is being generated for it
-    out_file = osp.join(out_dir, f"{split}/content/{scene_name}.json.gz")
-    if osp.exists(out_file) or osp.exists(out_file + ".incomplete"):
+
+def _chunk_ranges(start: int, stop: int, chunk_size: int):
+    return [(i, min(i + chunk_size, stop)) for i in range(start, stop, chunk_size)]
+
+
+def _chunk_file(parts_dir: str, start: int, stop: int) -> str:
+    return osp.join(parts_dir, f"{start:06d}-{stop:06d}.json.gz")
+
+
+def chunk_seed(scene_name: str, chunk_start: int) -> int:
+    """Seed for the chunk of a scene starting at chunk_start. Seeding every chunk
+    keeps chunks distinct from each other whichever worker or simulator generates
+    them, and makes a chunk regenerated after a crash identical to the lost one."""
+    return zlib.crc32(f"{scene_name}.{chunk_start}".encode())
+
+
+def _parts_dir(out_file: str) -> str:
+    """Directory holding the chunks of a scene that has not been merged yet. Its
+    name does not end in .json.gz, so habitat never picks it up as a scene."""
+    return out_file + ".parts"
+
+
+def _existing_chunks(parts_dir: str) -> list:
+    """(start, stop) ranges of the chunk files in parts_dir."""
+    chunks = []
+    for chunk_file in glob.glob(osp.join(parts_dir, "*-*.json.gz")):
+        start, stop = osp.basename(chunk_file)[: -len(".json.gz")].split("-")
+        chunks.append((int(start), int(stop)))
+    return chunks
+
+
+def _cover_range(chunks: list, start: int, stop: int):
+    """Split [start, stop) into existing chunks and the gaps between them. Returns
+    the chunks to use, in order, and the missing (start, stop) ranges. Chunks that
+    overlap the ones already picked, e.g. left by a run with another chunk size, are
+    ignored."""
+    covered, gaps = [], []
+    pos = start
+    # Longest chunk first among those starting at the same episode
+    for chunk_start, chunk_stop in sorted(chunks, key=lambda c: (c[0], -c[1])):
+        if chunk_start < pos or chunk_stop > stop:
+            continue
+        if chunk_start > pos:
+            gaps.append((pos, chunk_start))
+        covered.append((chunk_start, chunk_stop))
+        pos = chunk_stop
+    if pos < stop:
+        gaps.append((pos, stop))
+    return covered, gaps
+
+
+def split_scene(num_episodes: int, chunk_size: int, max_episodes_per_task=None):
+    """Split the episode range of a scene into (start, stop) task ranges whose
+    boundaries fall on chunk boundaries. Without max_episodes_per_task, the whole
+    scene is a single task."""
+    if max_episodes_per_task is None or max_episodes_per_task >= num_episodes:
+        return [(0, num_episodes)]
+    # Round up to a whole number of chunks so that tasks never share a chunk
+    task_size = -(-max_episodes_per_task // chunk_size) * chunk_size
+    return [
+        (i, min(i + task_size, num_episodes))
+        for i in range(0, num_episodes, task_size)
+    ]
+
+
+def merge_scene_parts(
+    out_file: str, num_episodes: int, write_kwargs: dict = None
+) -> bool:
+    """Concatenate the chunks of a scene into out_file and delete them. The chunks
+    are the files found in the scene's parts directory, whatever chunk size they
+    were generated with. Returns False without writing anything if some episodes
+    are still missing. write_kwargs are passed on to write_episodes."""
+    parts_dir = _parts_dir(out_file)
+    covered, gaps = _cover_range(_existing_chunks(parts_dir), 0, num_episodes)
+    if gaps:
+        return False
+    chunk_files = [_chunk_file(parts_dir, start, stop) for start, stop in covered]
+
+    def episodes():
+        for chunk_file in chunk_files:
+            yield from read_episodes(chunk_file)["episodes"]
+
+    # Top-level keys other than "episodes" are the same in every chunk
+    extra = read_episodes(chunk_files[0])
+    del extra["episodes"]
+    write_episodes(out_file, episodes(), extra, **(write_kwargs or {}))
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    return True
+
+
+def task_key(scene_name: str, start: int, stop: int) -> str:
+    """Key identifying the generation of episodes [start, stop) of a scene in the
+    work queue."""
+    return f"{scene_name}.{start:06d}-{stop:06d}"
+
+
+def _merge_if_complete(
+    queue: WorkQueue,
+    out_file: str,
+    scene_name: str,
+    ranges: list,
+    num_episodes: int,
+    write_kwargs: dict = None,
+):
+    """Merge the chunks of a scene if all its tasks are done and no other process is
+    already merging them. If chunks turn out to be missing anyway (e.g. deleted by
+    hand), the scene's tasks are marked as not done so that they are run again."""
+    if osp.exists(out_file):
         return
-    # Create parent of out_file if it doesn't exist
-    os.makedirs(osp.dirname(out_file), exist_ok=True)
-    # Create an empty file so other processes know this scene is being processed
-    with open(out_file + ".incomplete", "w") as f:
-        f.write("")
-
-    # Insert path to scene into config so it gets loaded
-    full_scene_path = osp.join(scene_dir, scene_path)
-    with habitat.config.read_write(cfg):
-        cfg.habitat.simulator.scene = full_scene_path
-    sim = habitat.sims.make_sim("Sim-v0", config=cfg.habitat.simulator)
-
-    dset = habitat.datasets.make_dataset("PointNav-v1")
-    dset.episodes = list(
-        generate_pointnav_episode(
-            sim,
-            num_episodes_per_scene,
-            is_gen_shortest_path=False,
+    keys = [task_key(scene_name, *r) for r in ranges]
+    if not all(queue.is_done(key) for key in keys):
+        return
+    lease = queue.acquire(f"{scene_name}.merge")
+    if lease is None:
+        return
+    with lease, profiling.span("merge_scene", scene=scene_name):
+        if osp.exists(out_file) or merge_scene_parts(
+            out_file, num_episodes, write_kwargs
+        ):
+            queue.mark_done(f"{scene_name}.merge")
+            return
+        print(f"Chunks of {scene_name} are missing; generating them again.")
+        for key in keys:
+            queue.unmark_done(key)
+
+
+def _generate_fn(
+    task: tuple,
+    scene_dir: str,
+    cfg: DictConfig,
+    out_dir: str,
+    queue: WorkQueue,
+    is_hm3d: bool = False,
+    split="train",
+    backend: HabitatBackend = HabitatBackend(),
+    max_tasks_per_worker=None,
+    max_rss_mb=None,
+    chunk_size: int = 100,
+    write_kwargs: dict = None,
+    profile: bool = False,
+):
+    """Returns whether the worker should be replaced (see _end_task), and the task,
+    how long it took, how many episodes were generated (0 if the task was skipped)
+    and the profiling spans recorded by this worker."""
+    if profile and not profiling.enabled():
+        profiling.enable()
+    start_time = time.time()
+    num_generated = 0
+    try:
+        num_generated = _generate_scene(
+            task,
+            scene_dir,
+            cfg,
+            out_dir,
+            queue,
+            is_hm3d,
+            split,
+            backend,
+            chunk_size,
+            write_kwargs,
         )
+    finally:
+        retire = _end_task(num_generated > 0, max_tasks_per_worker, max_rss_mb)
+    return retire, (task, time.time() - start_time, num_generated, profiling.drain())
+
+
+def _generate_scene(
+    task: tuple,
+    scene_dir: str,
+    cfg: DictConfig,
+    out_dir: str,
+    queue: WorkQueue,
+    is_hm3d: bool = False,
+    split="train",
+    backend: HabitatBackend = HabitatBackend(),
+    chunk_size: int = 100,
+    write_kwargs: dict = None,
+):
+    """Generate episodes [start, stop) of a scene, writing every chunk of
+    chunk_size episodes to its own file as soon as it is done. Episodes already
+    covered by chunks of an earlier run, even one with another chunk size, are
+    skipped. Returns the number of episodes generated."""
+    # Counts are only written for the merged file
+    chunk_write_kwargs = {**(write_kwargs or {}), "write_count": False}
+    scene, start, stop = task
+    scene_name, scene_path = _scene_paths(scene, split, is_hm3d)
+    key = task_key(scene_name, start, stop)
+
+    # Skip this task if the scene is finished, or if another process owns it
+    out_file = osp.join(out_dir, f"{split}/content/{scene_name}.json.gz")
+    if osp.exists(out_file):
+        queue.mark_done(key)
+        return 0
+    with profiling.span("acquire_lease"):
+        lease = queue.acquire(key)
+    if lease is None:
+        return 0
+
+    with lease:
+        parts_dir = _parts_dir(out_file)
+        os.makedirs(parts_dir, exist_ok=True)
+        _, gaps = _cover_range(_existing_chunks(parts_dir), start, stop)
+        chunks = [c for gap in gaps for c in _chunk_ranges(*gap, chunk_size)]
+        if chunks:
+            # Insert path to scene into config so it gets loaded
+            sim_cfg = backend.scene_config(cfg, osp.join(scene_dir, scene_path))
+            sim = _get_sim(sim_cfg, backend)
+
+        num_generated = 0
+        for chunk_start, chunk_stop in chunks:
+            # If our lease expired (e.g. the worker stalled), another process may
+            # have taken the task over, or even finished and merged the scene
+            if lease.lost or osp.exists(out_file) or not osp.isdir(parts_dir):
+                print(f"Lost the lease for {key}; leaving it to its new owner.")
+                return num_generated
+            with profiling.span("generate_episodes", scene=scene_name):
+                episodes = backend.generate_episodes(
+                    sim, chunk_stop - chunk_start, chunk_seed(scene_name, chunk_start)
+                )
+
+            # Episode ids restart at 0 for every call to the generator
+            for idx, ep in enumerate(episodes):
+                ep.episode_id = str(chunk_start + idx)
+                ep.scene_id = scene_path
+
+            # Same contents as the to_json() of a PointNav-v1 dataset holding these
+            # episodes, but streamed into the compressor. The file is renamed into
+            # place, so a crash never leaves a partial chunk
+            try:
+                write_episodes(
+                    _chunk_file(parts_dir, chunk_start, chunk_stop),
+                    episodes,
+                    default=backend.json_default,
+                    **chunk_write_kwargs,
+                )
+            except FileNotFoundError:
+                # The scene was merged, deleting the parts directory, while this
+                # chunk was being generated
+                if osp.isdir(parts_dir):
+                    raise
+                print(f"Lost the lease for {key}; leaving it to its new owner.")
+                return num_generated
+            num_generated += chunk_stop - chunk_start
+        queue.mark_done(key)
+        return num_generated
+
+
+def _run_tasks(fn, tasks: list, workers: int, is_runnable):
+    """Like Pool.imap_unordered(fn, tasks), but a task is only handed out once a
+    worker is idle, in order, and is skipped (yielding None) if is_runnable(task) is
+    False by then. fn returns (retire, result); a worker that returns retire=True is
+    replaced by a new process before it gets another task."""
+    finished = queue_lib.Queue()
+    # One single-process pool per worker, so that a given worker can be replaced
+    pools = [None] * min(workers, len(tasks))
+    idle = list(range(len(pools)))
+    pending = collections.deque(tasks)
+    try:
+        while pending or len(idle) < len(pools):
+            while idle and pending:
+                task = pending.popleft()
+                if not is_runnable(task):
+                    yield None
+                    continue
+                slot = idle.pop()
+                if pools[slot] is None:
+                    pools[slot] = multiprocessing.Pool(1)
+                pools[slot].apply_async(
+                    fn,
+                    (task,),
+                    callback=lambda r, slot=slot: finished.put((slot, r, None)),
+                    error_callback=lambda e, slot=slot: finished.put((slot, None, e)),
+                )
+            if len(idle) == len(pools):
+                continue
+            slot, result, error = finished.get()
+            idle.append(slot)
+            if error is not None:
+                raise error
+            retire, result = result
+            if retire:
+                pools[slot].close()
+                pools[slot].join()
+                pools[slot] = None
+            yield result
+    finally:
+        for pool in pools:
+            if pool is not None:
+                pool.terminate()
+
+
+def get_queue(out_dir: str, split: str, lease_timeout=180, heartbeat_interval=30):
+    return WorkQueue(
+        osp.join(out_dir, f"{split}/.queue"), lease_timeout, heartbeat_interval
     )
 
-    for ep in dset.episodes:
-        ep.scene_id = scene_path
 
-    os.makedirs(osp.dirname(out_file), exist_ok=True)
-    with gzip.open(out_file, "wt") as f:
-        f.write(dset.to_json())
-    os.remove(out_file + ".incomplete")
+def print_status(
+    out_dir: str,
+    split: str,
+    dataset_type: str,
+    num_episodes_per_scene: int,
+    chunk_size: int = 100,
+    max_episodes_per_task: int = None,
+    lease_timeout: float = 180,
+):
+    """Print the progress of every scene of a (possibly multi-node) generation run."""
+    queue = get_queue(out_dir, split, lease_timeout)
+    is_hm3d = dataset_type == "hm3d"
+    ranges = split_scene(num_episodes_per_scene, chunk_size, max_episodes_per_task)
+    counts = {"done": 0, "running": 0, "expired": 0, "pending": 0}
+    for scene in TRAIN_VAL_SPLITS[dataset_type][split]:
+        scene_name, _ = _scene_paths(scene, split, is_hm3d)
+        out_file = osp.join(out_dir, f"{split}/content/{scene_name}.json.gz")
+        if osp.exists(out_file):
+            counts["done"] += 1
+            print(f"{scene_name:<20} done")
+            continue
+        # Chunks may be of several sizes if the chunk size changed between runs
+        covered, _ = _cover_range(
+            _existing_chunks(_parts_dir(out_file)), 0, num_episodes_per_scene
+        )
+        episodes_done = sum(stop - start for start, stop in covered)
+        statuses = queue.status([task_key(scene_name, *r) for r in ranges])
+        owners = [
+            f"{v['host']}:{v['pid']} ({v['state']}, {v['age']:.0f}s)"
+            for v in statuses.values()
+            if v["state"] in ["running", "expired"]
+        ]
+        states = [v["state"] for v in statuses.values()]
+        # A scene is as far along as its most advanced task
+        for state in ["running", "expired", "pending", "done"]:
+            if state in states:
+                break
+        counts[state] += 1
+        print(
+            f"{scene_name:<20} {state:<8} episodes "
+            f"{episodes_done}/{num_episodes_per_scene} "
+            + ", ".join(owners)
+        )
+    print(", ".join(f"{v} {k}" for k, v in counts.items()))
 
 
 def generate_dataset(
@@ -75,29 +506,131 @@ def generate_dataset(
     dataset_type: str,
     overrides: list,
     num_episodes_per_scene: int,
+    workers: int = 27,
+    max_tasks_per_worker: int = None,
+    max_rss_mb: float = None,
+    chunk_size: int = 100,
+    max_episodes_per_task: int = None,
+    lease_timeout: float = 180,
+    heartbeat_interval: float = 30,
+    write_kwargs: dict = None,
+    backend: HabitatBackend = HabitatBackend(),
 ):
-    cfg = habitat.get_config(config_path=config_path, overrides=overrides)
+    """Generate episodes for every scene of the split. Any number of processes, on
+    any number of nodes, can run this at the same time with the same out_dir; they
+    share the work through a queue in out_dir and each returns once the whole split
+    is done."""
+    cfg = backend.load_config(config_path, overrides)
     is_hm3d = dataset_type == "hm3d"
     scenes = TRAIN_VAL_SPLITS[dataset_type][split]
     out_file = osp.join(out_dir, f"{split}/{split}.json.gz")
     os.makedirs(osp.dirname(out_file), exist_ok=True)
-    with gzip.open(out_file, "wt") as f:
-        f.write('{"episodes": []}')
+    if not osp.exists(out_file):
+        write_episodes(out_file, [])
+
+    queue = get_queue(out_dir, split, lease_timeout, heartbeat_interval)
+    ranges = split_scene(num_episodes_per_scene, chunk_size, max_episodes_per_task)
+    scene_files = {}
+    sizes = {}
+    for scene in scenes:
+        scene_name, scene_path = _scene_paths(scene, split, is_hm3d)
+        scene_files[scene] = (
+            scene_name,
+            osp.join(out_dir, f"{split}/content/{scene_name}.json.gz"),
+        )
+        sizes[scene_name] = scene_asset_size(osp.join(scene_dir, scene_path))
+    timings_file = osp.join(out_dir, f"{split}/.scene_timings.json")
+
+    def merge(scene):
+        scene_name, scene_file = scene_files[scene]
+        _merge_if_complete(
+            queue,
+            scene_file,
+            scene_name,
+            ranges,
+            num_episodes_per_scene,
+            write_kwargs,
+        )
 
     _generate_fn_partial = lambda x: _generate_fn(
         x,
         scene_dir,
         cfg,
         out_dir,
-        num_episodes_per_scene,
+        queue,
         is_hm3d,
         split,
+        backend,
+        max_tasks_per_worker,
+        max_rss_mb,
+        chunk_size,
+        write_kwargs,
+        profiling.enabled(),
     )
-    # Shuffle order of elements in scenes
-    random.shuffle(scenes)
-    with multiprocessing.Pool(27) as pool, tqdm.tqdm(total=len(scenes)) as pbar:
-        for _ in pool.imap_unordered(_generate_fn_partial, scenes):
-            pbar.update()
+    all_tasks = [(scene, start, stop) for scene in scenes for start, stop in ranges]
+    all_keys = [task_key(scene_files[t[0]][0], *t[1:]) for t in all_tasks]
+    keys = dict(zip(all_tasks, all_keys))
+
+    def is_runnable(task):
+        # Checked again right before a task is handed out, since other nodes may
+        # have taken it since the start of the pass
+        state = queue.status([keys[task]])[keys[task]]["state"]
+        return state in ["pending", "expired"]
+
+    while True:
+        # Only run tasks that nobody owns or whose owner died. Tasks owned by live
+        # processes are waited for until they are done or their leases expire. A
+        # failed merge marks tasks as not done again, so check all of them every pass
+        tasks = [t for t in all_tasks if is_runnable(t)]
+        if tasks:
+            # Hand out the most expensive tasks first, each to the next idle worker
+            costs, in_seconds = estimate_costs(
+                [scene_files[t[0]][0] for t in tasks],
+                [t[2] - t[1] for t in tasks],
+                sizes,
+                load_timings(timings_file),
+            )
+            order = longest_first(costs)
+            tasks = [tasks[i] for i in order]
+            predicted = None
+            if in_seconds:
+                predicted = predict_makespan([costs[i] for i in order], workers)
+
+            # Seconds and episodes spent on each scene during this pass
+            spent = collections.defaultdict(lambda: [0.0, 0])
+            start_time = time.time()
+            with tqdm.tqdm(total=len(tasks)) as pbar:
+                for result in _run_tasks(
+                    _generate_fn_partial, tasks, workers, is_runnable
+                ):
+                    pbar.update()
+                    if result is None:
+                        continue
+                    task, seconds, num_generated, events = result
+                    profiling.extend(events)
+                    if num_generated > 0:
+                        spent[task[0]][0] += seconds
+                        spent[task[0]][1] += num_generated
+                    merge(task[0])
+            print(format_makespan(predicted, time.time() - start_time))
+            record_timings(
+                timings_file,
+                {
+                    scene_files[scene][0]: {
+                        "seconds_per_episode": seconds / num_generated,
+                        "size": sizes[scene_files[scene][0]],
+                    }
+                    for scene, (seconds, num_generated) in spent.items()
+                },
+            )
+
+        # Catch scenes whose last task was finished by another node, or whose merge
+        # was interrupted
+        for scene in scenes:
+            merge(scene)
+        if all(osp.exists(f) for _, f in scene_files.values()):
+            break
+        time.sleep(heartbeat_interval)
 
 
 if __name__ == "__main__":
@@ -106,8 +639,8 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--exp-config",
-        required=True,
-        help="Path to config yaml used to setup the simulator",
+        help="Path to config yaml used to setup the simulator (required unless "
+        "--status is given)",
     )
     parser.add_argument(
         "--dataset-type",
@@ -144,17 +677,93 @@ if __name__ == "__main__":
         help="Number of episodes per scene",
         default=1000,
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of worker processes",
+        default=27,
+    )
+    parser.add_argument(
+        "--max-tasks-per-worker",
+        type=int,
+        help="Close the simulator and restart a worker after it has generated "
+        "episodes for this many tasks",
+        default=20,
+    )
+    parser.add_argument(
+        "--max-rss-mb",
+        type=float,
+        help="Close and recreate a worker's simulator once its RSS exceeds this "
+        "(Linux only)",
+        default=None,
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="Number of episodes written to disk at a time",
+        default=100,
+    )
+    parser.add_argument(
+        "--max-episodes-per-task",
+        type=int,
+        help="Split each scene into tasks of at most this many episodes so that "
+        "several workers can generate the same scene",
+        default=None,
+    )
+    parser.add_argument(
+        "--lease-timeout",
+        type=float,
+        help="Seconds without a heartbeat after which a task is considered abandoned "
+        "and is reclaimed",
+        default=180,
+    )
+    parser.add_argument(
+        "--heartbeat-interval",
+        type=float,
+        help="Seconds between heartbeats of the process working on a task",
+        default=30,
+    )
+    parser.add_argument(
+        "--status",
+        action="store_true",
+        help="Print the progress of each scene in --out-dir and exit",
+    )
+    add_writer_args(parser)
+    profiling.add_profile_args(parser, "generate_pointnav_episodes_profile")
     args = parser.parse_args()
     assert args.dataset_type in [
         "hm3d",
         "gibson",
     ], f"Invalid dataset type {args.dataset_type}"
-    generate_dataset(
-        args.exp_config,
-        args.scenes_dir,
-        args.split,
-        args.out_dir,
-        args.dataset_type,
-        args.overrides,
-        args.num_episodes_per_scene,
-    )
+    if args.status:
+        print_status(
+            args.out_dir,
+            args.split,
+            args.dataset_type,
+            args.num_episodes_per_scene,
+            args.chunk_size,
+            args.max_episodes_per_task,
+            args.lease_timeout,
+        )
+        sys.exit()
+    if args.exp_config is None:
+        parser.error("--exp-config is required")
+    with profiling.session(args.profile, args.cprofile):
+        generate_dataset(
+            args.exp_config,
+            args.scenes_dir,
+            args.split,
+            args.out_dir,
+            args.dataset_type,
+            args.overrides,
+            args.num_episodes_per_scene,
+            args.workers,
+            args.max_tasks_per_worker,
+            args.max_rss_mb,
+            args.chunk_size,
+            args.max_episodes_per_task,
+            args.lease_timeout,
+            args.heartbeat_interval,
+            writer_kwargs(args),
+        )
@@ -7,6 +7,8 @@ import torch
 import tqdm
 from torch.utils.tensorboard import SummaryWriter
 
+from habitat_utils import profiling
+
 
 def main(logs_dir, replace, tb_name):
     tb_dir = logs_to_tb_dir(logs_dir, tb_name)
@@ -22,7 +24,8 @@ def main(logs_dir, replace, tb_name):
             return
     print(f"Writing to {osp.abspath(tb_dir)}")
     writer = SummaryWriter(log_dir=tb_dir)
-    log_files = glob.glob(osp.join(logs_dir, "*.log"))
+    with profiling.span("glob"):
+        log_files = glob.glob(osp.join(logs_dir, "*.log"))
     log_files.sort(key=lambda x: int(x.split(".")[-2]))
     print(f"Found {len(log_files)} log files.")
     count = 0
@@ -31,20 +34,21 @@ def main(logs_dir, replace, tb_name):
         if len(aggregated_stats) == 0:
             print(f"Skipping {log_file} because it has no stats.")
             continue
-        writer.add_scalar(
-            "eval_reward/average_reward", aggregated_stats["reward"], step_id
-        )
+        with profiling.span("tb_write"):
+            writer.add_scalar(
+                "eval_reward/average_reward", aggregated_stats["reward"], step_id
+            )
 
-        metrics = {k: v for k, v in aggregated_stats.items() if k != "reward"}
-        for k, v in metrics.items():
-            writer.add_scalar(f"metrics/{k}", v, step_id)
+            metrics = {k: v for k, v in aggregated_stats.items() if k != "reward"}
+            for k, v in metrics.items():
+                writer.add_scalar(f"metrics/{k}", v, step_id)
         count += 1
     time.sleep(3)  # Need to wait for the writer to finish writing... =_=
     print(f"Successfully plotted {count} log files.")
 
 
 def log_to_stats(log_file):
-    with open(log_file, "r") as f:
+    with profiling.span("read_log"), open(log_file, "r") as f:
         log_contents = f.read()
 
     # Check if the step id is present in the file. If not, we have to load the
@@ -54,12 +58,14 @@ def log_to_stats(log_file):
     else:
         grandparent_dir = osp.dirname(osp.dirname(log_file))
         ckpt_basename = osp.basename(log_file).replace(".log", ".pth")
-        candidates = glob.glob(osp.join(grandparent_dir, f"*/{ckpt_basename}"))
+        with profiling.span("glob"):
+            candidates = glob.glob(osp.join(grandparent_dir, f"*/{ckpt_basename}"))
         assert (
             len(candidates) == 1
         ), f"Found {len(candidates)} candidates for {ckpt_basename}"
         ckpt_file = candidates[0]
-        ckpt = torch.load(ckpt_file, map_location="cpu")
+        with profiling.span("torch_load", ckpt=ckpt_basename):
+            ckpt = torch.load(ckpt_file, map_location="cpu")
         step_id = ckpt["extra_state"]["step"]
         # Add it to the file so we don't have to load the checkpoint again
         with open(log_file, "a") as f:
@@ -93,5 +99,7 @@ if __name__ == "__main__":
         help="Name of the tensorboard log directory (default=tb_eval)",
         default="tb_eval",
     )
+    profiling.add_profile_args(parser, "logs_to_tb_profile")
     args = parser.parse_args()
-    main(args.logs_dir, args.replace, args.tb_name)
+    with profiling.session(args.profile, args.cprofile):
+        main(args.logs_dir, args.replace, args.tb_name)
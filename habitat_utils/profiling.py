@@ -0,0 +1,192 @@
+"""
+Lightweight timing spans for the hot paths of the habitat_utils tools:
+
+    with profiling.span("glob"):
+        files = glob.glob(...)
+
+Spans are only recorded once enable() has been called (every tool does this when
+given --profile); until then span() returns a shared no-op context manager, so leaving
+the spans in place costs next to nothing.
+
+write_report() saves all recorded spans as a Chrome trace (open it in
+chrome://tracing or https://ui.perfetto.dev) and as a per-phase summary. Pool workers
+record spans on their own; they hand them to the parent with drain() and the parent
+adds them to its own with extend().
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+
+# Recorded spans as (name, start in epoch seconds, duration in seconds, pid, tid,
+# args) tuples, or None when profiling is disabled
+_EVENTS = None
+_PROFILER = None
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start", "start_perf")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.time()
+        self.start_perf = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start_perf
+        _EVENTS.append(
+            (
+                self.name,
+                self.start,
+                duration,
+                os.getpid(),
+                threading.get_ident(),
+                self.args,
+            )
+        )
+
+
+def span(name: str, **args):
+    """Context manager timing the enclosed block under the given phase name. Keyword
+    arguments are attached to the span in the trace."""
+    if _EVENTS is None:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def enabled() -> bool:
+    return _EVENTS is not None
+
+
+def enable(cprofile: bool = False):
+    """Start recording spans, and optionally run cProfile on this process."""
+    global _EVENTS, _PROFILER
+    if _EVENTS is None:
+        _EVENTS = []
+    if cprofile and _PROFILER is None:
+        _PROFILER = cProfile.Profile()
+        _PROFILER.enable()
+
+
+def drain() -> list:
+    """Return and forget the spans recorded by this process. Spans inherited from the
+    parent when a worker is forked are dropped."""
+    if _EVENTS is None:
+        return []
+    pid = os.getpid()
+    events = [e for e in _EVENTS if e[3] == pid]
+    _EVENTS.clear()
+    return events
+
+
+def extend(events: list):
+    """Add spans recorded by another process, e.g. returned by a pool worker."""
+    if _EVENTS is not None:
+        _EVENTS.extend(events)
+
+
+def summarize(events: list) -> dict:
+    """Count, total, mean and max seconds for each phase, longest total first."""
+    durations = defaultdict(list)
+    for name, _, duration, *_ in events:
+        durations[name].append(duration)
+    summary = {
+        name: {
+            "count": len(v),
+            "total": sum(v),
+            "mean": sum(v) / len(v),
+            "max": max(v),
+        }
+        for name, v in durations.items()
+    }
+    return dict(sorted(summary.items(), key=lambda x: -x[1]["total"]))
+
+
+def write_report(prefix: str):
+    """Write <prefix>.trace.json, <prefix>.summary.json and, if cProfile is running,
+    <prefix>.prof, and print the per-phase summary."""
+    global _PROFILER
+    events = _EVENTS or []
+    trace = {
+        "traceEvents": [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": duration * 1e6,
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            }
+            for name, start, duration, pid, tid, args in events
+        ],
+        "displayTimeUnit": "ms",
+    }
+    if os.path.dirname(prefix):
+        os.makedirs(os.path.dirname(prefix), exist_ok=True)
+    with open(f"{prefix}.trace.json", "w") as f:
+        json.dump(trace, f)
+    summary = summarize(events)
+    with open(f"{prefix}.summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(
+        f"{'phase':<24} {'count':>8} {'total (s)':>10} {'mean (s)':>10} "
+        f"{'max (s)':>10}"
+    )
+    for name, v in summary.items():
+        print(
+            f"{name:<24} {v['count']:>8} {v['total']:>10.3f} {v['mean']:>10.4f} "
+            f"{v['max']:>10.3f}"
+        )
+    print(f"Wrote {prefix}.trace.json and {prefix}.summary.json")
+
+    if _PROFILER is not None:
+        _PROFILER.disable()
+        _PROFILER.dump_stats(f"{prefix}.prof")
+        pstats.Stats(_PROFILER).sort_stats("cumulative").print_stats(20)
+        print(f"Wrote {prefix}.prof")
+        _PROFILER = None
+
+
+@contextlib.contextmanager
+def session(prefix: str = None, cprofile: bool = False):
+    """Profile the enclosed block and write the report when it exits, even on an
+    exception or Ctrl-C. Does nothing if prefix is None."""
+    if prefix is None:
+        yield
+        return
+    enable(cprofile)
+    try:
+        yield
+    finally:
+        write_report(prefix)
+
+
+def add_profile_args(parser, default_prefix: str):
+    """Add --profile and --cprofile to an argparse parser."""
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=default_prefix,
+        default=None,
+        metavar="PREFIX",
+        help="Record timing spans and write PREFIX.trace.json (Chrome trace) and "
+        f"PREFIX.summary.json (default PREFIX: {default_prefix})",
+    )
+    parser.add_argument(
+        "--cprofile",
+        action="store_true",
+        help="With --profile, also run cProfile on the main process and write "
+        "PREFIX.prof",
+    )
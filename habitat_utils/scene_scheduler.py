@@ -0,0 +1,97 @@
+"""
+Orders generation tasks longest-first so that huge scenes don't start last and leave a
+single worker running alone at the end of a run. The cost of a task is estimated from
+the seconds per episode recorded for its scene in earlier runs or, for scenes that were
+never timed, from the size of the scene's .glb and navmesh files.
+"""
+
+import heapq
+import json
+import os
+import os.path as osp
+import statistics
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+
+def scene_asset_size(full_scene_path: str) -> int:
+    """Total size in bytes of the scene mesh and its navmesh, if they exist."""
+    navmesh_path = osp.splitext(full_scene_path)[0] + ".navmesh"
+    return sum(osp.getsize(i) for i in [full_scene_path, navmesh_path] if osp.exists(i))
+
+
+def load_timings(timings_file: str) -> Dict[str, dict]:
+    """Load past generation times, stored as a mapping from scene name to
+    {"seconds_per_episode": float, "size": int}."""
+    if not osp.exists(timings_file):
+        return {}
+    with open(timings_file, "r") as f:
+        return json.load(f)
+
+
+def record_timings(timings_file: str, new_timings: Dict[str, dict]):
+    """Merge new per-scene timings into the timings file. The file is re-read right
+    before writing so that entries recorded by other nodes are kept."""
+    if not new_timings:
+        return
+    timings = load_timings(timings_file)
+    timings.update(new_timings)
+    os.makedirs(osp.dirname(timings_file), exist_ok=True)
+    # Pids are only unique per node, and other nodes write this file too
+    tmp_file = f"{timings_file}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(timings, f, indent=2, sort_keys=True)
+    os.replace(tmp_file, timings_file)
+
+
+def estimate_costs(
+    scene_names: List[str],
+    num_episodes: List[int],
+    sizes: Dict[str, int],
+    timings: Dict[str, dict],
+) -> Tuple[List[float], bool]:
+    """Estimate the cost of generating num_episodes[i] episodes of scene_names[i].
+
+    Scenes with recorded timings use their own seconds per episode. The others use
+    their asset size times the median seconds per episode per byte of the timed
+    scenes. Returns the costs and whether they are in seconds; without any timings,
+    the costs are only proportional to asset size times number of episodes.
+    """
+    rates = [
+        v["seconds_per_episode"] / v["size"] for v in timings.values() if v["size"] > 0
+    ]
+    rate = statistics.median(rates) if rates else None
+    costs = []
+    for scene_name, n in zip(scene_names, num_episodes):
+        if scene_name in timings:
+            costs.append(timings[scene_name]["seconds_per_episode"] * n)
+        elif rate is not None:
+            costs.append(sizes[scene_name] * rate * n)
+        else:
+            costs.append(float(sizes[scene_name] * n))
+    return costs, rate is not None
+
+
+def longest_first(costs: List[float]) -> List[int]:
+    """Indices of the tasks, sorted by decreasing cost."""
+    return sorted(range(len(costs)), key=lambda i: -costs[i])
+
+
+def predict_makespan(costs: List[float], workers: int) -> float:
+    """Time until the last worker finishes when the tasks are handed to the first
+    idle worker in the given order."""
+    finish_times = [0.0] * min(workers, len(costs))
+    if not finish_times:
+        return 0.0
+    for cost in costs:
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + cost)
+    return max(finish_times)
+
+
+def format_makespan(predicted: Optional[float], actual: float) -> str:
+    if predicted is None:
+        return f"Makespan: {actual:.0f}s (no timings recorded yet to predict it)"
+    return (
+        f"Makespan: predicted {predicted:.0f}s, actual {actual:.0f}s "
+        f"({actual / max(predicted, 1e-6):.2f}x)"
+    )
@@ -23,7 +23,7 @@ import subprocess
 import time
 from datetime import datetime
 
-from habitat_utils.logs_to_tb import main as logs_to_tb
+from habitat_utils import profiling
 
 THIS_DIR = osp.dirname(osp.abspath(__file__))
 SINGLE_CKPT_TEMPLATE = osp.join(THIS_DIR, "single_ckpt_eval.sh")
@@ -85,11 +85,16 @@ def main(
             log_count = new_log_count
             try:
                 print("Attempting to update tb logs...")
-                logs_to_tb(
-                    get_log_dir(ckpt_dir, logs_name),
-                    replace=True,
-                    tb_name=tb_name,
-                )
+                # Imported here since it needs torch, which the rest of this module
+                # (e.g. count_log_files) doesn't
+                from habitat_utils.logs_to_tb import main as logs_to_tb
+
+                with profiling.span("logs_to_tb"):
+                    logs_to_tb(
+                        get_log_dir(ckpt_dir, logs_name),
+                        replace=True,
+                        tb_name=tb_name,
+                    )
             except Exception as e:
                 print(f"Failed to convert logs to tensorboard: {e}")
                 print("Continuing anyway.")
@@ -189,7 +194,8 @@ class Evaluator:
             with open(dummy_file, "w") as f:
                 f.write("")
 
-        subprocess.check_call(sbatch_cmd, env=os.environ)
+        with profiling.span("sbatch", job_name=job_name):
+            subprocess.check_call(sbatch_cmd, env=os.environ)
 
     def submit_eval_jobs(self):
         # 1. Get all checkpoints that have not been queued
@@ -225,19 +231,21 @@ class Evaluator:
             basename = osp.basename(ckpt).replace(".pth", ".log")
             return osp.exists(osp.join(log_dir, basename))
 
-        checkpoints = glob.glob(osp.join(self.ckpt_dir, "*ckpt.*.pth"))
-        unqueued_checkpoints = [
-            c
-            for c in checkpoints
-            if not queued_exists(c) and not log_exists(c)
-        ]
+        with profiling.span("glob"):
+            checkpoints = glob.glob(osp.join(self.ckpt_dir, "*ckpt.*.pth"))
+        with profiling.span("stat_checkpoints"):
+            unqueued_checkpoints = [
+                c
+                for c in checkpoints
+                if not queued_exists(c) and not log_exists(c)
+            ]
         # Each ckpt has basename "ckpt.N.pth"; sort in descending order.
         unqueued_checkpoints.sort(key=lambda x: -int(x.split(".")[-2]))
         return unqueued_checkpoints
 
 
 def log_file_is_valid(log_file):
-    with open(log_file, "r") as f:
+    with profiling.span("read_log"), open(log_file, "r") as f:
         log_contents = f.read()
     return "Average episode " in log_contents
 
@@ -250,7 +258,8 @@ def get_log_dir(ckpt_dir, logs_name):
 def count_log_files(ckpt_dir, logs_name, needs_stats=False):
     """Count the number of log files in the given directory."""
     log_dir = get_log_dir(ckpt_dir, logs_name)
-    logs = glob.glob(osp.join(log_dir, "*.log"))
+    with profiling.span("glob"):
+        logs = glob.glob(osp.join(log_dir, "*.log"))
     if needs_stats:
         filtered_logs = [log for log in logs if log_file_is_valid(log)]
         return len(filtered_logs)
@@ -357,5 +366,9 @@ if __name__ == "__main__":
         help="Whether to submit jobs in a held state (default=False)",
         action="store_true",
     )
+    profiling.add_profile_args(parser, "slurm_eval_profile")
     args = parser.parse_args()
-    main(**vars(args))
+    profile, cprofile = args.profile, args.cprofile
+    del args.profile, args.cprofile
+    with profiling.session(profile, cprofile):
+        main(**vars(args))
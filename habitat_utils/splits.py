@@ -0,0 +1,20 @@
+"""
+Scene lists of the train and val splits of each dataset type, from
+train_val_splits.yaml at the root of the repo. Kept separate from
+generate_pointnav_episodes so that tools which only need the scene lists don't
+import habitat and the generator's other dependencies.
+"""
+
+import os.path as osp
+
+import yaml
+
+SPLITS_FILE = osp.join(
+    osp.dirname(osp.dirname(osp.abspath(__file__))), "train_val_splits.yaml"
+)
+
+
+def load_train_val_splits(path: str = SPLITS_FILE) -> dict:
+    """Mapping from dataset type to split to list of scenes."""
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
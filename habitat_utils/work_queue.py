@@ -0,0 +1,207 @@
+"""
+A work queue for coordinating several processes, possibly on different nodes, through
+a shared filesystem. Every task is identified by a key that is safe to use as a
+filename. Under the queue's root directory:
+
+- locks/<key>.lock is created with O_EXCL by the process working on the task, and
+  contains its host, pid and a random token. The owner touches the file every
+  heartbeat_interval seconds; a lock whose mtime is older than lease_timeout belongs to
+  a dead process and can be reclaimed by anyone. Reclaiming is serialized by a
+  locks/<key>.lock.reclaim file, also created with O_EXCL.
+- done/<key> is created once the task has been completed.
+
+lease_timeout must be comfortably larger than heartbeat_interval plus the clock skew
+between the nodes sharing the filesystem.
+"""
+
+import json
+import os
+import os.path as osp
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+
+class Lease:
+    """Exclusive ownership of a task. Keeps the lock file fresh from a background
+    thread until released."""
+
+    def __init__(self, queue: "WorkQueue", key: str, token: str):
+        self.queue = queue
+        self.key = key
+        self.token = token
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True)
+        self._thread.start()
+
+    def _heartbeat(self):
+        lock_file = self.queue.lock_path(self.key)
+        while not self._stop.wait(self.queue.heartbeat_interval):
+            if self.queue.read_lock(self.key).get("token") != self.token:
+                # Our lease expired and someone else reclaimed the task
+                self.lost = True
+                return
+            try:
+                os.utime(lock_file)
+            except FileNotFoundError:
+                self.lost = True
+                return
+
+    def release(self):
+        """Stop the heartbeat and delete the lock file if it is still ours."""
+        self._stop.set()
+        self._thread.join()
+        if self.queue.read_lock(self.key).get("token") == self.token:
+            try:
+                os.remove(self.queue.lock_path(self.key))
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class WorkQueue:
+    def __init__(
+        self, root: str, lease_timeout: float = 180, heartbeat_interval: float = 30
+    ):
+        self.root = root
+        self.lease_timeout = lease_timeout
+        self.heartbeat_interval = heartbeat_interval
+
+    def lock_path(self, key: str) -> str:
+        return osp.join(self.root, "locks", f"{key}.lock")
+
+    def done_path(self, key: str) -> str:
+        return osp.join(self.root, "done", key)
+
+    def is_done(self, key: str) -> bool:
+        return osp.exists(self.done_path(key))
+
+    def mark_done(self, key: str):
+        os.makedirs(osp.dirname(self.done_path(key)), exist_ok=True)
+        with open(self.done_path(key), "w") as f:
+            f.write("")
+
+    def unmark_done(self, key: str):
+        """Make a task available again, e.g. when its output turned out to be lost."""
+        try:
+            os.remove(self.done_path(key))
+        except FileNotFoundError:
+            pass
+
+    def read_lock(self, key: str) -> dict:
+        """Contents of the lock file of the given task, or {} if it isn't locked (or
+        the owner hasn't finished writing it yet)."""
+        try:
+            with open(self.lock_path(key), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def lock_age(self, key: str) -> Optional[float]:
+        """Seconds since the owner of the task last sent a heartbeat, or None if the
+        task isn't locked."""
+        try:
+            return time.time() - os.path.getmtime(self.lock_path(key))
+        except FileNotFoundError:
+            return None
+
+    def acquire(self, key: str) -> Optional[Lease]:
+        """Try to take ownership of a task. Returns None if the task is done or a live
+        process owns it."""
+        if self.is_done(key):
+            return None
+        lock_file = self.lock_path(key)
+        os.makedirs(osp.dirname(lock_file), exist_ok=True)
+        # Two attempts: the second one follows the reclaiming of an expired lease
+        for _ in range(2):
+            try:
+                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self._reclaim(key):
+                    return None
+                continue
+            token = uuid.uuid4().hex
+            with os.fdopen(fd, "w") as f:
+                owner = {
+                    "host": socket.gethostname(),
+                    "pid": os.getpid(),
+                    "token": token,
+                    "acquired": time.time(),
+                }
+                json.dump(owner, f)
+            lease = Lease(self, key, token)
+            # The previous owner may have finished right before we took the lock
+            if self.is_done(key):
+                lease.release()
+                return None
+            return lease
+        return None
+
+    def _reclaim(self, key: str) -> bool:
+        """Remove the lock of a task if its lease has expired. Returns True if the
+        lock is gone and acquiring it can be retried."""
+        age = self.lock_age(key)
+        if age is None:
+            return True
+        if age < self.lease_timeout:
+            return False
+        # Only one process at a time may reclaim a lock. Otherwise a process that saw
+        # the expired lock could delete the fresh lock of another process that
+        # reclaimed and re-acquired the task in the meantime
+        guard_file = self.lock_path(key) + ".reclaim"
+        try:
+            fd = os.open(guard_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            # Left behind by a process that died while reclaiming; the next attempt
+            # can go ahead
+            try:
+                if time.time() - os.path.getmtime(guard_file) > self.lease_timeout:
+                    os.remove(guard_file)
+            except FileNotFoundError:
+                pass
+            return False
+        os.close(fd)
+        try:
+            # The lock may have been replaced before we got the guard
+            age = self.lock_age(key)
+            if age is None:
+                return True
+            if age < self.lease_timeout:
+                return False
+            try:
+                os.remove(self.lock_path(key))
+            except FileNotFoundError:
+                pass
+            print(f"Reclaimed expired lease for {key} (last heartbeat {age:.0f}s ago)")
+            return True
+        finally:
+            os.remove(guard_file)
+
+    def status(self, keys: List[str]) -> Dict[str, dict]:
+        """Return the state of each task: one of done, running, expired or pending.
+        Running and expired tasks also report their owner and heartbeat age."""
+        statuses = {}
+        for key in keys:
+            if self.is_done(key):
+                statuses[key] = {"state": "done"}
+                continue
+            age = self.lock_age(key)
+            if age is None:
+                statuses[key] = {"state": "pending"}
+                continue
+            owner = self.read_lock(key)
+            statuses[key] = {
+                "state": "running" if age < self.lease_timeout else "expired",
+                "host": owner.get("host"),
+                "pid": owner.get("pid"),
+                "age": age,
+            }
+        return statuses
@@ -0,0 +1,13 @@
+import os.path as osp
+
+from habitat_utils import benchmark
+
+TINY = {"num_logs": 20, "num_scenes": 2, "episodes_per_scene": 10}
+
+
+def test_checkpoint_benchmarks_run_without_torch(tmp_path):
+    # Their fixtures use empty checkpoints, so neither needs torch installed
+    assert benchmark.bench_count_log_files(str(tmp_path / "a"), TINY)() == 18
+    unqueued = benchmark.bench_get_unqueued_checkpoints(str(tmp_path / "b"), TINY)()
+    # Logs are left out for every tenth checkpoint, none of which is queued
+    assert [osp.basename(c) for c in unqueued] == ["ckpt.19.pth", "ckpt.9.pth"]
@@ -0,0 +1,131 @@
+import math
+import os
+import os.path as osp
+
+import numpy as np
+
+from habitat_utils import dataset_stats
+from habitat_utils.episode_io import write_episodes
+from habitat_utils.splits import load_train_val_splits
+
+
+def pointnav_episode(start, goal, geodesic):
+    return {
+        "episode_id": "0",
+        "scene_id": "gibson/Cantwel.glb",
+        "start_position": start,
+        "info": {"geodesic_distance": geodesic},
+        "goals": [{"position": goal, "radius": None}],
+    }
+
+
+def objectnav_episode(category, geodesic):
+    return {
+        "episode_id": "0",
+        "scene_id": "hm3d/val/00800-TEEsavR23oF/TEEsavR23oF.basis.glb",
+        "start_position": [0.0, 0.0, 0.0],
+        "info": {"geodesic_distance": geodesic},
+        "goals": [],
+        "object_category": category,
+    }
+
+
+def make_files(tmp_path):
+    pointnav = str(tmp_path / "pointnav.json.gz")
+    write_episodes(
+        pointnav,
+        [
+            pointnav_episode([0.0, 0.0, 0.0], [3.0, 0.0, 4.0], 6.0),
+            pointnav_episode([0.0, 0.0, 0.0], [0.0, 0.0, 1.0], 2.0),
+        ],
+    )
+    objectnav = str(tmp_path / "objectnav.json.gz")
+    write_episodes(
+        objectnav, [objectnav_episode("chair", 3.0), objectnav_episode("bed", 4.0)]
+    )
+    return pointnav, objectnav
+
+
+def test_compute_stats(tmp_path):
+    per_file = [dataset_stats.extract_fields(f) for f in make_files(tmp_path)]
+    fields = {
+        k: np.concatenate([i[k] for i in per_file]) for k in dataset_stats.FIELDS
+    }
+    stats = dataset_stats.compute_stats(fields, bins=4)
+    assert stats["num_episodes"] == 4
+    assert stats["episodes_per_scene"] == {"Cantwel": 2, "TEEsavR23oF": 2}
+    assert stats["geodesic_distance"]["count"] == 4
+    assert math.isclose(stats["geodesic_distance"]["mean"], 3.75)
+    # ObjectNav goals aren't stored with the episodes, so they have no Euclidean
+    # distance
+    assert stats["euclidean_distance"]["count"] == 2
+    assert stats["euclidean_distance"]["max"] == 5.0
+    assert stats["geodesic_to_euclidean_ratio"]["min"] == 1.2
+    assert stats["geodesic_to_euclidean_ratio"]["max"] == 2.0
+    assert stats["object_categories"] == {"bed": 1, "chair": 1}
+    assert sum(stats["geodesic_distance_histogram"]["counts"]) == 4
+    assert stats["geodesic_distance_histogram"]["edges"][-1] == 6.0
+
+
+def content_files(scenes):
+    return [f"split/content/{scene}.json.gz" for scene in scenes]
+
+
+def test_validate_gibson():
+    scenes = load_train_val_splits()["gibson"]["val"]
+    files = content_files(scenes[1:] + ["Adrian"])
+    counts = {scene: 10 for scene in scenes}
+    counts.update({scenes[1]: 0, scenes[2]: 9})
+    problems = dataset_stats.validate(
+        files, {"episodes_per_scene": counts}, "gibson", "val", 10
+    )
+    assert problems == [
+        f"Missing content file for scene {scenes[0]}",
+        "Scene Adrian is not in the gibson val split",
+        f"Scene {scenes[1]} has no episodes",
+        f"Scene {scenes[2]} has 9 episodes instead of 10",
+    ]
+
+
+def test_validate_hm3d_strips_scene_number():
+    scenes = [i.split("-")[-1] for i in load_train_val_splits()["hm3d"]["val"]]
+    stats = {"episodes_per_scene": {scene: 1 for scene in scenes}}
+    assert dataset_stats.validate(content_files(scenes), stats, "hm3d", "val") == []
+    problems = dataset_stats.validate(
+        content_files(["00800-TEEsavR23oF"] + scenes[1:]), stats, "hm3d", "val"
+    )
+    assert problems == [
+        f"Missing content file for scene {scenes[0]}",
+        "Scene 00800-TEEsavR23oF is not in the hm3d val split",
+    ]
+
+
+def test_load_fields_cache_is_invalidated(tmp_path, monkeypatch):
+    path, _ = make_files(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+    extract_fields = dataset_stats.extract_fields
+    monkeypatch.setattr(
+        dataset_stats,
+        "extract_fields",
+        lambda p: calls.append(p) or extract_fields(p),
+    )
+
+    assert len(dataset_stats.load_fields(path, cache_dir)["geodesic"]) == 2
+    assert len(dataset_stats.load_fields(path, cache_dir)["geodesic"]) == 2
+    assert len(calls) == 1
+    assert len(os.listdir(cache_dir)) == 1
+
+    # Same contents, new mtime
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    dataset_stats.load_fields(path, cache_dir)
+    assert len(calls) == 2
+
+    # New contents of another size
+    write_episodes(path, [pointnav_episode([0.0] * 3, [1.0, 0.0, 0.0], 1.0)])
+    fields = dataset_stats.load_fields(path, cache_dir)
+    assert len(calls) == 3
+    assert fields["geodesic"].tolist() == [1.0]
+    assert osp.getsize(path) != stat.st_size
+    assert len(os.listdir(cache_dir)) == 1
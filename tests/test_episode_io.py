@@ -0,0 +1,32 @@
+import json
+import math
+
+from habitat_utils.episode_io import count_path, read_episodes, write_episodes
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "scene.json.gz")
+    episodes = [
+        {"episode_id": str(i), "start_position": [i / 3, 0.0]} for i in range(5)
+    ]
+    assert write_episodes(path, episodes, {"category_to_task_category_id": {}}) == 5
+    assert read_episodes(path) == {
+        "episodes": episodes,
+        "category_to_task_category_id": {},
+    }
+
+
+def test_nan_and_infinity_are_read_back(tmp_path):
+    path = str(tmp_path / "scene.json.gz")
+    write_episodes(path, [{"info": {"geodesic_distance": math.inf}, "x": math.nan}])
+    episode = read_episodes(path)["episodes"][0]
+    assert episode["info"]["geodesic_distance"] == math.inf
+    assert math.isnan(episode["x"])
+
+
+def test_float_precision_and_count(tmp_path):
+    path = str(tmp_path / "scene.json.gz")
+    write_episodes(path, [{"x": 1 / 3}], float_precision=2, write_count=True)
+    assert read_episodes(path)["episodes"] == [{"x": 0.33}]
+    with open(count_path(path)) as f:
+        assert json.load(f) == {"num_episodes": 1}
@@ -0,0 +1,228 @@
+import multiprocessing
+import os
+import os.path as osp
+import random
+import shutil
+import types
+
+from habitat_utils import generate_pointnav_episodes as gen
+from habitat_utils.episode_io import read_episodes
+
+
+class FakeSim:
+    def __init__(self, sim_cfg):
+        self.scene = sim_cfg["scene"]
+        self.num_reconfigures = 0
+        self.closed = False
+
+    def reconfigure(self, sim_cfg):
+        self.scene = sim_cfg["scene"]
+        self.num_reconfigures += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBackend(gen.HabitatBackend):
+    """Stands in for habitat: no config files, simulator or scene assets needed.
+    Every call to generate_episodes is appended to log_file, if given."""
+
+    def __init__(self, log_file=None):
+        self.log_file = log_file
+
+    def load_config(self, config_path, overrides):
+        return {}
+
+    def scene_config(self, cfg, scene_path):
+        return {"scene": scene_path}
+
+    def make_sim(self, sim_cfg):
+        return FakeSim(sim_cfg)
+
+    def generate_episodes(self, sim, num_episodes, seed):
+        if self.log_file is not None:
+            # Appends of a single short line are atomic
+            with open(self.log_file, "a") as f:
+                f.write(f"{sim.scene} {seed}\n")
+        rng = random.Random(seed)
+        return [
+            types.SimpleNamespace(
+                episode_id=str(i),
+                scene_id=sim.scene,
+                start_position=[rng.random() for _ in range(3)],
+            )
+            for i in range(num_episodes)
+        ]
+
+    def json_default(self, obj):
+        return vars(obj)
+
+
+def run_generate_dataset(out_dir, backend=None, **kwargs):
+    gen.generate_dataset(
+        None,
+        "scenes",
+        "val",
+        str(out_dir),
+        "gibson",
+        [],
+        20,
+        workers=2,
+        chunk_size=5,
+        heartbeat_interval=0.1,
+        backend=backend or FakeBackend(),
+        **kwargs,
+    )
+
+
+def check_split(out_dir, num_episodes=20):
+    for scene in gen.TRAIN_VAL_SPLITS["gibson"]["val"]:
+        out_file = osp.join(out_dir, f"val/content/{scene}.json.gz")
+        episodes = read_episodes(out_file)["episodes"]
+        assert [ep["episode_id"] for ep in episodes] == [
+            str(i) for i in range(num_episodes)
+        ]
+        assert all(ep["scene_id"] == f"gibson/{scene}.glb" for ep in episodes)
+        assert not osp.exists(out_file + ".parts")
+
+
+def test_sim_is_reused_then_closed():
+    gen._WORKER_STATE.update(sim=None, num_tasks=0)
+    backend = FakeBackend()
+    sim = gen._get_sim({"scene": "a.glb"}, backend)
+    assert not gen._end_task(True, max_tasks_per_worker=2)
+    # Tasks that didn't use the simulator don't count
+    assert not gen._end_task(False, max_tasks_per_worker=2)
+    assert gen._get_sim({"scene": "b.glb"}, backend) is sim
+    assert sim.scene == "b.glb" and sim.num_reconfigures == 1
+    assert gen._end_task(True, max_tasks_per_worker=2)
+    assert sim.closed and gen._WORKER_STATE["sim"] is None
+
+
+def test_generate_dataset_with_fake_backend(tmp_path):
+    run_generate_dataset(tmp_path, max_tasks_per_worker=3, max_episodes_per_task=10)
+    check_split(tmp_path)
+
+
+def test_chunks_are_distinct_and_reproducible(tmp_path):
+    run_generate_dataset(tmp_path / "a", max_episodes_per_task=10)
+    run_generate_dataset(tmp_path / "b")
+    for scene in gen.TRAIN_VAL_SPLITS["gibson"]["val"]:
+        a, b = (
+            read_episodes(osp.join(tmp_path, i, f"val/content/{scene}.json.gz"))
+            for i in "ab"
+        )
+        # Same episodes whether the scene was split across workers or not
+        assert a == b
+        positions = [tuple(ep["start_position"]) for ep in a["episodes"]]
+        assert len(set(positions)) == len(positions)
+
+
+def test_cover_range_skips_overlapping_chunks():
+    chunks = [(0, 5), (0, 10), (5, 10), (10, 15), (18, 20)]
+    assert gen._cover_range(chunks, 0, 20) == (
+        [(0, 10), (10, 15), (18, 20)],
+        [(15, 18)],
+    )
+    assert gen._cover_range(chunks, 5, 12) == ([(5, 10)], [(10, 12)])
+
+
+def generate_task(out_dir, scene, chunk_size):
+    gen._WORKER_STATE.update(sim=None, num_tasks=0)
+    queue = gen.get_queue(str(out_dir), "val")
+    gen._generate_scene(
+        (scene, 0, 20),
+        "scenes",
+        {},
+        str(out_dir),
+        queue,
+        False,
+        "val",
+        FakeBackend(),
+        chunk_size,
+    )
+    return osp.join(out_dir, f"val/content/{scene}.json.gz.parts")
+
+
+def test_merge_uses_chunks_of_another_chunk_size(tmp_path):
+    scene = gen.TRAIN_VAL_SPLITS["gibson"]["val"][0]
+    parts_dir = generate_task(tmp_path, scene, chunk_size=4)
+    assert len(os.listdir(parts_dir)) == 5
+    run_generate_dataset(tmp_path)
+    check_split(tmp_path)
+
+
+def test_missing_chunks_are_generated_again(tmp_path):
+    scene = gen.TRAIN_VAL_SPLITS["gibson"]["val"][0]
+    parts_dir = generate_task(tmp_path, scene, chunk_size=5)
+    os.remove(osp.join(parts_dir, "000005-000010.json.gz"))
+    run_generate_dataset(tmp_path)
+    check_split(tmp_path)
+
+
+def test_processes_share_the_work(tmp_path):
+    # Each process stands for a node running the script on the same out_dir
+    log_file = str(tmp_path / "generated.log")
+    nodes = [
+        multiprocessing.Process(
+            target=run_generate_dataset,
+            args=(tmp_path, FakeBackend(log_file)),
+            kwargs={"max_episodes_per_task": 10},
+        )
+        for _ in range(3)
+    ]
+    for node in nodes:
+        node.start()
+    for node in nodes:
+        node.join(timeout=120)
+        assert node.exitcode == 0
+    check_split(tmp_path)
+    with open(log_file) as f:
+        generated = f.read().splitlines()
+    # Every chunk was generated exactly once, by one of the nodes
+    assert len(generated) == len(set(generated)) == 14 * 4
+
+
+def test_workers_are_replaced_only_when_they_retire():
+    tasks = list(range(6))
+    # Odd tasks were taken by another node in the meantime and never reach a worker
+    run = lambda retire: list(
+        gen._run_tasks(
+            lambda t: (retire, (t, os.getpid())), tasks, 2, lambda t: t % 2 == 0
+        )
+    )
+    results = run(retire=False)
+    assert results.count(None) == 3
+    assert sorted(r[0] for r in results if r is not None) == [0, 2, 4]
+    assert len({r[1] for r in results if r is not None}) <= 2
+    results = run(retire=True)
+    assert len({r[1] for r in results if r is not None}) == 3
+
+
+def test_stalled_worker_stops_once_the_scene_is_merged(tmp_path):
+    scene = gen.TRAIN_VAL_SPLITS["gibson"]["val"][0]
+    out_file = osp.join(tmp_path, f"val/content/{scene}.json.gz")
+
+    class StalledBackend(FakeBackend):
+        def generate_episodes(self, sim, num_episodes, seed):
+            # Meanwhile, another node finishes the scene and merges it
+            os.makedirs(osp.dirname(out_file), exist_ok=True)
+            gen.write_episodes(out_file, [])
+            shutil.rmtree(out_file + ".parts")
+            return super().generate_episodes(sim, num_episodes, seed)
+
+    gen._WORKER_STATE.update(sim=None, num_tasks=0)
+    queue = gen.get_queue(str(tmp_path), "val")
+    task = (scene, 0, 20)
+    args = ("scenes", {}, str(tmp_path), queue, False, "val", StalledBackend(), 5)
+    assert gen._generate_scene(task, *args) == 0
+    assert not queue.is_done(gen.task_key(scene, 0, 20))
+
+
+def test_status_counts_episodes_of_mixed_chunk_sizes(tmp_path, capsys):
+    scene = gen.TRAIN_VAL_SPLITS["gibson"]["val"][0]
+    parts_dir = generate_task(tmp_path, scene, chunk_size=4)
+    # Left over from a run with a chunk size of 10
+    gen.write_episodes(osp.join(parts_dir, "000010-000020.json.gz"), [])
+    gen.print_status(str(tmp_path), "val", "gibson", 20, chunk_size=10)
+    assert f"{scene:<20} done     episodes 20/20" in capsys.readouterr().out
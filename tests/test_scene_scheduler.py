@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from habitat_utils.scene_scheduler import (
+    estimate_costs,
+    load_timings,
+    longest_first,
+    predict_makespan,
+    record_timings,
+)
+
+TIMINGS = {
+    "a": {"seconds_per_episode": 2.0, "size": 100},
+    "b": {"seconds_per_episode": 6.0, "size": 200},
+    "c": {"seconds_per_episode": 1.0, "size": 400},
+}
+
+
+def test_timed_scenes_use_their_own_rate():
+    costs, in_seconds = estimate_costs(["a", "b"], [10, 5], {}, TIMINGS)
+    assert costs == [20.0, 30.0]
+    assert in_seconds
+
+
+def test_untimed_scenes_are_scaled_by_the_median_rate():
+    # Seconds per episode per byte: a 0.02, b 0.03, c 0.0025; the median is 0.02
+    costs, in_seconds = estimate_costs(["d", "a"], [10, 10], {"d": 50}, TIMINGS)
+    assert costs == pytest.approx([10.0, 20.0])
+    assert in_seconds
+
+
+def test_without_timings_costs_are_size_times_episodes():
+    costs, in_seconds = estimate_costs(["d", "e"], [10, 3], {"d": 50, "e": 400}, {})
+    assert costs == [500.0, 1200.0]
+    assert not in_seconds
+
+
+def test_longest_first():
+    assert longest_first([3.0, 5.0, 1.0, 4.0]) == [1, 3, 0, 2]
+
+
+def test_predict_makespan():
+    assert predict_makespan([5, 4, 3, 3], 2) == 8
+    assert predict_makespan([5, 4, 3, 3], 8) == 5
+    assert predict_makespan([], 2) == 0.0
+
+
+def test_record_timings_keeps_existing_entries(tmp_path):
+    timings_file = str(tmp_path / "split" / ".scene_timings.json")
+    assert load_timings(timings_file) == {}
+    record_timings(timings_file, {"a": TIMINGS["a"], "b": TIMINGS["b"]})
+    # Another node records its scenes, and an updated timing for b
+    record_timings(timings_file, {"b": TIMINGS["c"], "c": TIMINGS["c"]})
+    with open(timings_file) as f:
+        assert json.load(f) == {"a": TIMINGS["a"], "b": TIMINGS["c"], "c": TIMINGS["c"]}
+    assert [p.name for p in (tmp_path / "split").iterdir()] == [".scene_timings.json"]
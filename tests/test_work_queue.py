@@ -0,0 +1,40 @@
+import os
+import time
+
+from habitat_utils.work_queue import WorkQueue
+
+
+def make_stale(path, queue):
+    old = time.time() - 2 * queue.lease_timeout
+    os.utime(path, (old, old))
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    queue = WorkQueue(str(tmp_path), lease_timeout=10, heartbeat_interval=5)
+    lease = queue.acquire("a")
+    assert lease is not None and queue.acquire("a") is None
+    # Simulate an owner that died without releasing its lease
+    lease._stop.set()
+    make_stale(queue.lock_path("a"), queue)
+    new_lease = queue.acquire("a")
+    assert new_lease is not None
+    assert queue.read_lock("a")["token"] == new_lease.token
+    assert not os.path.exists(queue.lock_path("a") + ".reclaim")
+    new_lease.release()
+
+
+def test_reclaim_waits_for_other_reclaimer(tmp_path):
+    queue = WorkQueue(str(tmp_path), lease_timeout=10, heartbeat_interval=5)
+    queue.acquire("a")._stop.set()
+    make_stale(queue.lock_path("a"), queue)
+    guard_file = queue.lock_path("a") + ".reclaim"
+    open(guard_file, "w").close()
+    # Another process is reclaiming the lock, so leave it alone
+    assert queue.acquire("a") is None
+    assert os.path.exists(queue.lock_path("a"))
+    # Until its guard is so old that the other process must have died
+    make_stale(guard_file, queue)
+    assert queue.acquire("a") is None
+    lease = queue.acquire("a")
+    assert lease is not None
+    lease.release()